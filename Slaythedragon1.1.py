@@ -1,12 +1,20 @@
+import logging
 import pygame
 import random
 import sys
 import time
+from collections import OrderedDict
+from simulation import Simulation, SimConfig, BOARD_SIZE, FPS
+from timestep import FixedTimestep
+from input_queue import InputQueue
+from profiler import FrameProfiler, log
+from telemetry import TelemetryWriter
+from replay import ReplayRecorder
+from audio import BackgroundMusic
 # Constants for board size and cell size
-BOARD_SIZE = 25
 CELL_SIZE = 25  
-WIDTH, HEIGHT = BOARD_SIZE * CELL_SIZE, BOARD_SIZE * CELL_SIZE
-FPS = 10
+VIEW_CELLS = BOARD_SIZE  # cells visible at once, larger boards scroll with the knight
+CAMERA_MARGIN = 6  # cells kept between the knight and the edge of the view
 
 # Define Colors
 WHITE = (255, 255, 255)
@@ -15,169 +23,261 @@ BLUE = (0, 0, 255)
 ORANGE = (255, 165, 0)  # Active fireball (fatal) color
 BLACK = (0, 0, 0)
 RED = (255,0,0)
+GREEN = (0, 255, 0)
+MAGENTA = (255, 0, 255)  # transparent color key
+
+TRACE_FILE = "frame_trace.json"
+MUSIC_FILE = "NyanCatoriginal.mp3"
+
+EVENT_MESSAGES = {
+    "dragon_hit": "Dragon takes damage! HP is now %(hp)d",
+    "dragon_teleport": "Dragon teleports to a new position!",
+    "player_hit": "Player hit by fireball!",
+    "player_hit_random": "Player hit by random fireball!",
+    "powerup_collected": "Power-up collected!",
+    "invincibility_ended": "Invincibility ended.",
+    "powerup_spawned": "Power-up spawned!",
+}
+
+KEY_MOVES = {
+    pygame.K_UP: (0, -1),
+    pygame.K_DOWN: (0, 1),
+    pygame.K_LEFT: (-1, 0),
+    pygame.K_RIGHT: (1, 0),
+}
+
+class TextCache:
+    """LRU cache of rendered text, so each string is rasterized once.
+
+    Text that changes every frame (score, timer) is drawn with blit_glyphs,
+    which reuses one cached surface per character instead.
+    """
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.surfaces = OrderedDict()
+
+    def render(self, font, text, color):
+        key = (text, color, font)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = font.render(text, True, color)
+            self.surfaces[key] = surface
+            if len(self.surfaces) > self.maxsize:
+                self.surfaces.popitem(last=False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
+
+    def blit_glyphs(self, target, font, text, color, position):
+        """Draw ``text`` one cached character at a time and return the covered rect."""
+        x, y = position
+        height = 0
+        for char in text:
+            glyph = self.render(font, char, color)
+            target.blit(glyph, (x, y))
+            x += glyph.get_width()
+            height = max(height, glyph.get_height())
+        return pygame.Rect(position[0], y, x - position[0], height)
+
 
 class Board:
-    def __init__(self, surface):
+    """Draws the cells in view; ``board_size`` is the number of cells across the view.
+
+    ``camera`` is the board cell shown in the top left corner, positions
+    passed to draw_cell are board cells.
+    """
+    def __init__(self, surface, board_size=BOARD_SIZE):
         self.surface = surface
+        self.board_size = board_size
+        self.camera = (0, 0)
+        self.background = None
+        self.render_background()
+
+    def render_background(self):
+        """Prerender the white board with its grid lines, once.
+
+        A board smaller than the window sits in its top left corner; the
+        rest of the window is gray.
+        """
+        background = pygame.Surface(self.surface.get_size()).convert()
+        background.fill(GRAY)
+        size = self.board_size * CELL_SIZE
+        background.fill(WHITE, (0, 0, size, size))
+        for x in range(0, size + 1, CELL_SIZE):
+            pygame.draw.line(background, GRAY, (x, 0), (x, size))
+        for y in range(0, size + 1, CELL_SIZE):
+            pygame.draw.line(background, GRAY, (0, y), (size, y))
+        self.background = background
 
     def draw_grid(self):
-        self.surface.fill(WHITE)
-        for x in range(0, WIDTH, CELL_SIZE):
-            pygame.draw.line(self.surface, GRAY, (x, 0), (x, HEIGHT))
-        for y in range(0, HEIGHT, CELL_SIZE):
-            pygame.draw.line(self.surface, GRAY, (0, y), (WIDTH, y))
-
-class Player:
-    def __init__(self, position=(0, 0)):
-        self.position = position
-
-    def move(self, dx, dy):
-        x, y = self.position
-        new_x = x + dx
-        new_y = y + dy
-        if 0 <= new_x < BOARD_SIZE and 0 <= new_y < BOARD_SIZE:
-            self.position = (new_x, new_y)
-
-    def draw(self, surface, color=BLUE):
-        x, y = self.position
-        rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-        pygame.draw.rect(surface, color, rect)
-
-class Dragon:
-    def __init__(self, position=(BOARD_SIZE-1, BOARD_SIZE-1), hp=10):
-        self.position = position
-        self.hp = hp
-        self.fireball_cooldown = 0  # Delay timer for shooting
-
-    def take_damage(self):
-        self.hp -= 1
-        print(f"Dragon takes damage! HP is now {self.hp}")
-
-    def randomize_position(self):
-        self.position = (random.randint(0, BOARD_SIZE - 1),
-                         random.randint(0, BOARD_SIZE - 1))
-        print("Dragon teleports to a new position!")
-
-    def shoot_fireballs(self):
-        """Shoots straight-line fireballs but has a cooldown."""
-        if 5 <= self.hp < 8:
-            if self.fireball_cooldown == 0:
-                self.fireball_cooldown = 5  # Set delay before next shot
-                return [Fireball(self.position, direction) for direction in ["up", "down", "left", "right"]]
-        return []
-
-    def spawn_fireballs(self):
-        """Spawns random fireballs when HP < 5."""
-        if self.hp < 5:
-            return [FireballRandom() for _ in range(6 - self.hp)]
-        return []
-
-    def update_cooldown(self):
-        if self.fireball_cooldown > 0:
-            self.fireball_cooldown -= 1
-
-    def draw(self, surface, font):
-        x, y = self.position
-        rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-        pygame.draw.rect(surface, RED, rect)
-        hp_text = font.render(str(self.hp), True, WHITE)
-        text_rect = hp_text.get_rect(center=rect.center)
-        surface.blit(hp_text, text_rect)
-
-class Fireball:
-    """Moving fireball (straight-line)."""
-    def __init__(self, position, direction):
-        self.position = position
-        self.direction = direction
-
-    def move(self):
-        x, y = self.position
-        if self.direction == "up":
-            y -= 1
-        elif self.direction == "down":
-            y += 1
-        elif self.direction == "left":
-            x -= 1
-        elif self.direction == "right":
-            x += 1
-
-        if 0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE:
-            self.position = (x, y)
-            return True
-        return False
-
-    def draw(self, surface):
-        x, y = self.position
-        rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-        pygame.draw.rect(surface, ORANGE, rect)
-
-class FireballRandom:
-    """Randomly appearing fireball with a limited lifetime."""
-    def __init__(self):
-        self.position = (random.randint(0, BOARD_SIZE - 1), random.randint(0, BOARD_SIZE - 1))
-        self.lifetime = random.randint(10, 30)  # Fireball lasts 10-30 frames
+        self.surface.blit(self.background, (0, 0))
 
-    def update(self):
-        self.lifetime -= 1
-        return self.lifetime > 0  # Returns True if still alive
+    def restore(self, rect):
+        """Paint the background back over ``rect``."""
+        self.surface.blit(self.background, rect, rect)
 
-    def draw(self, surface):
-        x, y = self.position
+    def draw_cell(self, position, color):
+        """Fill one cell."""
+        x = position[0] - self.camera[0]
+        y = position[1] - self.camera[1]
         rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-        pygame.draw.rect(surface, ORANGE, rect)
-class PowerUp:
-    def __init__(self):
-        self.position = (random.randint(0, BOARD_SIZE - 1), random.randint(0, BOARD_SIZE - 1))
+        pygame.draw.rect(self.surface, color, rect)
+        return rect
 
-    def draw(self, surface):
-        x, y = self.position
-        rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-        pygame.draw.rect(surface, (0, 255, 0), rect)  # Green color
 
+class BoardRaster:
+    """Draws the whole board with one scaled blit instead of one rect per entity.
 
+    Every cell color in view is written into a board_size x board_size array
+    (``board_size`` cells across the view), pushed to a one-pixel-per-cell
+    surface with surfarray and scaled up to CELL_SIZE, so the Python cost of
+    a frame barely depends on how many fireballs there are.
+    """
+    def __init__(self, surface, board_size):
+        import numpy
+        self.np = numpy
+        self.surface = surface
+        self.colors = {name: numpy.array(color, dtype=numpy.uint8)
+                       for name, color in (("white", WHITE), ("orange", ORANGE),
+                                           ("red", RED), ("green", GREEN))}
+        self.cells = numpy.empty((board_size, board_size, 3), dtype=numpy.uint8)
+        self.cell_surface = pygame.Surface((board_size, board_size), 0, surface)
+        size = board_size * CELL_SIZE
+        self.board_surface = surface.subsurface((0, 0, size, size))
+        # Grid lines drawn once on a color-keyed overlay, which also paints
+        # the window gray outside a board smaller than the window
+        self.grid = pygame.Surface(surface.get_size())
+        self.grid.fill(GRAY)
+        self.grid.fill(MAGENTA, (0, 0, size, size))
+        self.grid.set_colorkey(MAGENTA)
+        for x in range(0, size + 1, CELL_SIZE):
+            pygame.draw.line(self.grid, GRAY, (x, 0), (x, size))
+        for y in range(0, size + 1, CELL_SIZE):
+            pygame.draw.line(self.grid, GRAY, (0, y), (size, y))
+        self.grid = self.grid.convert()
+
+    def draw(self, sim, player_color, camera=(0, 0)):
+        np, cells, colors = self.np, self.cells, self.colors
+        view = cells.shape[0]
+        left, top = camera
+
+        def cell(position):
+            x, y = position[0] - left, position[1] - top
+            return (x, y) if 0 <= x < view and 0 <= y < view else None
+
+        cells[:] = colors["white"]
+        # Same paint order as the rect renderer: player, dragon, fireballs, power-up
+        cells[cell(sim.player.position)] = player_color
+        if sim.dragon.hp > 0 and cell(sim.dragon.position):
+            cells[cell(sim.dragon.position)] = colors["red"]
+        straight = sim.fireballs.positions_in(left, top, left + view, top + view)
+        if straight:
+            xy = np.array(straight)
+            cells[xy[:, 0] - left, xy[:, 1] - top] = colors["orange"]
+        randoms = sim.fireball_randoms
+        if randoms.count:
+            xs = np.array(randoms.x[:randoms.count]) - left
+            ys = np.array(randoms.y[:randoms.count]) - top
+            shown = (xs >= 0) & (xs < view) & (ys >= 0) & (ys < view)
+            cells[xs[shown], ys[shown]] = colors["orange"]
+        if sim.powerup and cell(sim.powerup.position):
+            cells[cell(sim.powerup.position)] = colors["green"]
+        pygame.surfarray.blit_array(self.cell_surface, cells)
+        pygame.transform.scale(self.cell_surface, self.board_surface.get_size(), self.board_surface)
+        self.surface.blit(self.grid, (0, 0))
 
 
 class Game:
-    def __init__(self):
-        pygame.init()
-        self.surface = pygame.display.set_mode((WIDTH, HEIGHT))
+    def __init__(self, seed=None, config=None, render_mode="rects", immediate_input=False,
+                 trace=False, telemetry=None, record=None):
+        # ms per startup phase up to the first frame, logged with --verbose
+        self.startup = OrderedDict()
+        self.startup_mark = time.perf_counter()
+        self.first_frame = False
+        # Only what the first frame needs; the mixer comes up with the music
+        pygame.display.init()
+        pygame.font.init()
+        self.mark_startup("subsystems")
+        self.sim = Simulation(seed, config=config)
+        self.mark_startup("simulation")
+        board_size = self.sim.config.board_size
+        # Boards larger than the view scroll; only the cells in view are drawn
+        self.view_cells = min(board_size, VIEW_CELLS)
+        self.camera = (0, 0)  # board cell in the top left corner of the window
+        # The window never shrinks below the full view, so the intro and
+        # game over screens fit even when the board is smaller
+        self.width = self.height = VIEW_CELLS * CELL_SIZE
+        self.surface = pygame.display.set_mode((self.width, self.height))
         pygame.display.set_caption("Dragon Game - Fireball Delay")
+        self.mark_startup("window")
         self.clock = pygame.time.Clock()
-        self.board = Board(self.surface)
-        self.font = pygame.font.SysFont(None, 30)
-        self.player = Player(position=(0, 0))
-        self.dragon = Dragon(position=(random.randint(0, BOARD_SIZE - 1),
-                                        random.randint(0, BOARD_SIZE - 1)))
-        self.final_time = []
-        self.fireballs = []
-        self.fireball_randoms = []
-        self.game_over = False
-        self.win = False
-        self.start_time = pygame.time.get_ticks()  # record the starting time
-
-        self.timer_running = True  # Timer is running at the start
-        self.move_count = 0
-        self.powerups_collected = 0
-
-  
-     
-       
-        self.powerup = None
-        self.invincible = False
-        self.invincible_timer = 0
-        self.normal_fps = FPS
-        self.fast_fps = 20
-        self.score = 5000
-        self.powerup_spawn_time = pygame.time.get_ticks()  # track last spawn time
+        self.board = Board(self.surface, self.view_cells)
+        # "raster" draws the board from a color array (needs numpy)
+        self.raster = BoardRaster(self.surface, self.view_cells) if render_mode == "raster" else None
+        self.mark_startup("renderer")
+        # The default font; SysFont(None) gives the same one after scanning
+        # every installed font first
+        self.font = pygame.font.Font(None, 30)
+        self.hud_font = pygame.font.Font(None, 20)
+        self.mark_startup("fonts")
+        self.text = TextCache()
+        self.intro_screen = None
+        self.message_screen = None
+        self.message_key = None
+        self.dirty_rects = []  # screen areas drawn on the last frame
+        self.full_redraw = True  # next frame repaints the whole window
+        # Finished runs are appended to data.csv by a background thread
+        self.telemetry = telemetry
+        self.sim.telemetry = telemetry
+        # Each run is saved as a replay to the ``record`` path (replay.py plays it back)
+        self.recorder = ReplayRecorder(record).attach(self.sim) if record else None
+        # Simulation ticks at FPS; frames are capped at a fixed render_fps,
+        # which is not synced to the display's refresh rate
+        self.scheduler = FixedTimestep(FPS)
+        self.render_fps = 60
+        # Arrow key presses, one consumed per tick (or applied at once if immediate)
+        self.input = InputQueue(immediate=immediate_input)
+        # Per-phase frame timings, HUD toggled with F3, Chrome trace written with F4
+        self.profiler = FrameProfiler(trace=trace)
+        self.sim.profiler = self.profiler
+        self.show_profiler = False
+        self.hud_lines = []
+        self.hud_frames = 0
 
         self.show_intro = True
-        pygame.mixer.init()
-        pygame.mixer.music.load("NyanCatoriginal.mp3")
+        self.mark_startup("setup")
+        # Only needed at the first power-up; a missing file means no music
+        self.music = BackgroundMusic(MUSIC_FILE)
+        self.mark_startup("audio_thread")
+
+    def mark_startup(self, phase):
+        """Record the ms spent in ``phase``, i.e. since the previous mark."""
+        now = time.perf_counter()
+        self.startup[phase] = 1000 * (now - self.startup_mark)
+        self.startup_mark = now
+
+    def report_startup(self):
+        log.info("First frame after %.1f ms (%s)", sum(self.startup.values()),
+                 ", ".join(f"{phase} {ms:.1f}" for phase, ms in self.startup.items()))
+
     def introduction_screen(self):
-        self.surface.fill(WHITE)
-        title_text = self.font.render("Slay the Dragon!", True, BLACK)
-        title_rect = title_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 150))
-        self.surface.blit(title_text, title_rect)
+        if self.intro_screen is None:
+            self.intro_screen = self.compose_intro()
+        self.surface.blit(self.intro_screen, (0, 0))
+        self.full_redraw = True  # the board has to be repainted after this screen
+        pygame.display.flip()
+        if not self.first_frame:
+            self.first_frame = True
+            self.mark_startup("first_frame")
+            self.report_startup()
+
+    def compose_intro(self):
+        """Render the intro screen once; it is only re-blitted afterwards."""
+        screen = pygame.Surface(self.surface.get_size()).convert()
+        screen.fill(WHITE)
+        title_text = self.text.render(self.font, "Slay the Dragon!", BLACK)
+        title_rect = title_text.get_rect(center=(self.width // 2, self.height // 2 - 150))
+        screen.blit(title_text, title_rect)
 
         instructions = [
             "Oh No! The dragon have been escaping from the zoo!",
@@ -194,151 +294,96 @@ class Game:
         ]
 
         for i, line in enumerate(instructions):
-            line_text = self.font.render(line, True, BLACK)
-            line_rect = line_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 100 + i * 30))
-            self.surface.blit(line_text, line_rect)
+            line_text = self.text.render(self.font, line, BLACK)
+            line_rect = line_text.get_rect(center=(self.width // 2, self.height // 2 - 100 + i * 30))
+            screen.blit(line_text, line_rect)
 
         # Draw Start Button
-        self.start_button = pygame.Rect(WIDTH // 2 - 100, HEIGHT // 2 + 220, 200, 50)
-        pygame.draw.rect(self.surface, (0, 200, 0), self.start_button)
-        start_text = self.font.render("Start Game", True, WHITE)
+        self.start_button = pygame.Rect(self.width // 2 - 100, self.height // 2 + 220, 200, 50)
+        pygame.draw.rect(screen, (0, 200, 0), self.start_button)
+        start_text = self.text.render(self.font, "Start Game", WHITE)
         start_rect = start_text.get_rect(center=self.start_button.center)
-        self.surface.blit(start_text, start_rect)
-
-        pygame.display.flip()
+        screen.blit(start_text, start_rect)
+        return screen
 
     
-    def update_fireballs(self):
-        new_fireballs = []
-        for fireball in self.fireballs:
-            if fireball.move():
-                new_fireballs.append(fireball)
-            if fireball.position == self.player.position and not self.invincible:
-                self.game_over = True
-                self.win = False
-                print("Player hit by fireball!")
-
-        self.fireballs = new_fireballs
-
-        # Update random fireballs
-        new_randoms = []
-        for fireball in self.fireball_randoms:
-            if fireball.position == self.player.position and not self.invincible:
-                self.game_over = True
-                self.win = False
-                print("Player hit by random fireball!")
-            elif fireball.update():
-                new_randoms.append(fireball)
-
-        self.fireball_randoms = new_randoms
-
-
-
     def handle_events(self):
-        dx, dy = 0, 0
+        """Queue arrow key presses; in immediate mode apply them right away."""
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+                self.quit()
             
-            if self.game_over:
+            if self.sim.game_over:
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     mouse_x, mouse_y = pygame.mouse.get_pos()
-                    if (WIDTH // 2 - 100 <= mouse_x <= WIDTH // 2 + 100 and
-                        HEIGHT // 2 + 80 <= mouse_y <= HEIGHT // 2 + 130):
+                    if (self.width // 2 - 100 <= mouse_x <= self.width // 2 + 100 and
+                        self.height // 2 + 80 <= mouse_y <= self.height // 2 + 130):
                         self.restart_game()
-                        self.game_over = False  # <-- ADD THIS LINE
-                        self.final_time.clear() # <-- CLEAR previous final_time
                         return  # Exit early to avoid extra input handling
 
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_UP:
-                    dy = -1
-                    self.move_count += 1
-                elif event.key == pygame.K_DOWN:
-                    dy = 1
-                    self.move_count += 1
-                elif event.key == pygame.K_LEFT:
-                    dx = -1
-                    self.move_count += 1
-                elif event.key == pygame.K_RIGHT:
-                    dx = 1
-                    self.move_count += 1
-
-        if dx or dy:
-            self.player.move(dx, dy)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.show_profiler = not self.show_profiler
+                self.full_redraw = True
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                count = self.profiler.export_chrome_trace(TRACE_FILE)
+                log.warning("Wrote %d trace events to %s", count, TRACE_FILE)
+
+            elif event.type == pygame.KEYDOWN and event.key in KEY_MOVES:
+                dx, dy = KEY_MOVES[event.key]
+                pressed_at = self.input.clock()
+                if self.input.immediate:
+                    if self.sim.move(dx, dy):
+                        self.input.applied(pressed_at)
+                else:
+                    self.input.push(dx, dy, pressed_at)
+
+    def apply_queued_move(self):
+        """Apply the oldest queued move, one per simulation tick."""
+        move = self.input.pop()
+        if move is not None:
+            dx, dy, pressed_at = move
+            if self.sim.move(dx, dy):
+                self.input.applied(pressed_at)
     
     def handle_gameover_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                
-                pygame.quit()
-                sys.exit()
+                self.quit()
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_x, mouse_y = pygame.mouse.get_pos()
-                if (WIDTH // 2 - 100 <= mouse_x <= WIDTH // 2 + 100 and
-                    HEIGHT // 2 + 80 <= mouse_y <= HEIGHT // 2 + 130):
+                if (self.width // 2 - 100 <= mouse_x <= self.width // 2 + 100 and
+                    self.height // 2 + 80 <= mouse_y <= self.height // 2 + 130):
                     self.restart_game()
 
 
 
-    def update_game(self):
-        if self.player.position == self.dragon.position:
-            self.dragon.take_damage()
-            self.dragon.randomize_position()
-            if self.dragon.hp <= 0:
-                self.game_over = True
-                self.win = True
-
-
-        self.dragon.update_cooldown()
-        self.fireballs += self.dragon.shoot_fireballs()
-        self.fireball_randoms += self.dragon.spawn_fireballs()
-
-        self.update_fireballs()
-
-        # Check power-up pickup
-        if self.powerup and self.player.position == self.powerup.position:
-            print("Power-up collected!")
-            
-            pygame.mixer.music.play()
-            self.invincible = True
-            self.invincible_timer = pygame.time.get_ticks()  # current time in ms
-            self.clock.tick(self.fast_fps)  # temporarily faster FPS
-            self.score = max(0, self.score - 500)
-            self.powerup = None
-            self.powerups_collected += 1
-            
-          
-        # Handle invincibility duration
-        if self.invincible:
-            
-            if pygame.time.get_ticks() - self.invincible_timer >= 5000:
-                self.invincible = False
-                pygame.mixer.music.pause()
-                print("Invincibility ended.")
-                self.clock.tick(self.normal_fps)
-
-        # Randomly spawn a powerup (1 in 300 chance per tick)
-        if not self.powerup and random.randint(1, 300) == 1:
-            self.powerup = PowerUp()
-
-        self.score -= 1  # Increase score per tick
-
-        # Spawn a power-up every 20 seconds
-        current_time = pygame.time.get_ticks()
-        if not self.powerup and current_time - self.powerup_spawn_time >= 20000:
-            self.powerup = PowerUp()
-            self.powerup_spawn_time = current_time
-            print("Power-up spawned!")
+    def update_game(self, dx=0, dy=0):
+        events = self.sim.step(dx, dy)
+        if not events:
+            return
+        if "powerup_collected" in events:
+            self.music.play()
+        if "invincibility_ended" in events:
+            self.music.pause()
+        if log.isEnabledFor(logging.INFO):
+            for event in events:
+                if event in EVENT_MESSAGES:
+                    log.info(EVENT_MESSAGES[event], {"hp": self.sim.dragon.hp})
 
 
 
     def draw_game(self):
-        self.board.draw_grid()
+        """Draw the board and HUD.
+
+        In the default mode only the cells and text that changed are pushed to
+        the screen; in raster mode the whole board is one scaled blit.
+        Every entity is drawn in its cell of the last tick, where it is
+        lethal, even when frames are rendered between ticks.
+        """
+        sim = self.sim
 
         # Player color logic
-        if self.invincible:
+        if sim.invincible:
             player_color = (
                 random.randint(0, 255),
                 random.randint(0, 255),
@@ -347,135 +392,234 @@ class Game:
         else:
             player_color = BLUE
 
-        self.player.draw(self.surface, player_color)
-
-        if self.dragon.hp > 0:
-            self.dragon.draw(self.surface, self.font)
-        for fireball in self.fireballs:
-            fireball.draw(self.surface)
-        for fireball in self.fireball_randoms:
-            fireball.draw(self.surface)
+        self.follow_player()
+        if self.raster is not None:
+            self.raster.draw(sim, player_color, self.camera)
+            self.full_redraw = True
+            rects = []
+        else:
+            rects = self.draw_cells(player_color)
 
-        # Draw power-up if exists
-        if self.powerup:
-            self.powerup.draw(self.surface)
+        if sim.dragon.hp > 0 and self.in_view(sim.dragon.position):
+            x, y = sim.dragon.position
+            cell = pygame.Rect((x - self.camera[0]) * CELL_SIZE, (y - self.camera[1]) * CELL_SIZE,
+                               CELL_SIZE, CELL_SIZE)
+            hp_text = self.text.render(self.font, str(sim.dragon.hp), WHITE)
+            rects.append(self.surface.blit(hp_text, hp_text.get_rect(center=cell.center)))
 
         # Draw score
-        score_text = self.font.render(f"Score: {self.score}", True, BLACK)
-        self.surface.blit(score_text, (5, 5))
+        rects.append(self.text.blit_glyphs(self.surface, self.font, f"Score: {sim.score}", BLACK, (5, 5)))
 
         # Show Invincible status
-        if self.invincible:
-            inv_text = self.font.render("INVINCIBLE!", True, (255, 0, 0))
-            self.surface.blit(inv_text, (5, 35))
+        if sim.invincible:
+            inv_text = self.text.render(self.font, "INVINCIBLE!", (255, 0, 0))
+            rects.append(self.surface.blit(inv_text, (5, 35)))
 
-        pygame.display.flip()
         # Draw timer
-        elapsed_time = (pygame.time.get_ticks() - self.start_time) // 1000  # in seconds
-        timer_text = self.font.render(f"Time: {elapsed_time}s", True, BLACK)
-        self.surface.blit(timer_text, (5, 65))
+        elapsed_time = sim.elapsed_seconds()
+        rects.append(self.text.blit_glyphs(self.surface, self.font, f"Time: {elapsed_time}s", BLACK, (5, 65)))
+
+        if self.show_profiler:
+            rects.extend(self.draw_profiler_hud())
+
+        start = self.profiler.clock()
+        if self.full_redraw:
+            pygame.display.flip()
+            self.full_redraw = False
+        else:
+            pygame.display.update(self.dirty_rects + rects)
+        self.profiler.record("flip", start)
+        self.dirty_rects = rects
+
+    def follow_player(self):
+        """Scroll the view so the knight stays CAMERA_MARGIN cells away from its edges."""
+        view, size = self.view_cells, self.sim.config.board_size
+        if view == size:
+            return
+        margin = min(CAMERA_MARGIN, (view - 1) // 2)
+        camera = []
+        for corner, player in zip(self.camera, self.sim.player.position):
+            corner = min(max(corner, player - view + 1 + margin), player - margin)
+            camera.append(max(0, min(corner, size - view)))
+        camera = tuple(camera)
+        if camera != self.camera:
+            self.camera = self.board.camera = camera
+            self.full_redraw = True  # everything on screen moved
+
+    def in_view(self, position):
+        x, y = position[0] - self.camera[0], position[1] - self.camera[1]
+        return 0 <= x < self.view_cells and 0 <= y < self.view_cells
+
+    def draw_profiler_hud(self):
+        """Phase timings and entity counts in the bottom left corner (toggle with F3)."""
+        self.hud_frames += 1
+        if self.hud_frames % 10 == 1:
+            # Refreshing the numbers every frame would make them unreadable anyway
+            self.hud_lines = [f"{phase}: p50 {stat['p50_ms']:.2f}  p95 {stat['p95_ms']:.2f}  "
+                              f"p99 {stat['p99_ms']:.2f} ms"
+                              for phase, stat in self.profiler.stats().items()]
+            self.hud_lines += [f"{name}: {value}" for name, value in self.profiler.counters.items()]
+        rects = []
+        y = self.height - 18 * len(self.hud_lines) - 5
+        for line in self.hud_lines:
+            rects.append(self.text.blit_glyphs(self.surface, self.hud_font, line, BLACK, (5, y)))
+            y += 18
+        return rects
+
+    def draw_cells(self, player_color):
+        """Draw every entity as its own rect and return the rects that were touched."""
+        sim = self.sim
+        # With a crowded board one full repaint is cheaper than many small ones
+        if len(self.dirty_rects) > self.view_cells ** 2 // 8:
+            self.full_redraw = True
+        if self.full_redraw:
+            self.board.draw_grid()
+        else:
+            # Erase everything drawn on the last frame
+            for rect in self.dirty_rects:
+                self.board.restore(rect)
+        in_view = self.in_view
+        rects = [self.board.draw_cell(sim.player.position, player_color)]
+        if sim.dragon.hp > 0 and in_view(sim.dragon.position):
+            rects.append(self.board.draw_cell(sim.dragon.position, RED))
+        left, top = self.camera
+        view = self.view_cells
+        for position in sim.fireballs.positions_in(left, top, left + view, top + view):
+            rects.append(self.board.draw_cell(position, ORANGE))
+        for position in sim.fireball_randoms.positions():
+            if in_view(position):
+                rects.append(self.board.draw_cell(position, ORANGE))
+
+        # Draw power-up if exists
+        if sim.powerup and in_view(sim.powerup.position):
+            rects.append(self.board.draw_cell(sim.powerup.position, GREEN))
+        return rects
 
 
 
     def display_message(self, message, elapsed_time=None, score=None , powerup = None , movecount = None):
-        self.surface.fill(WHITE)
-        text = self.font.render(message, True, BLACK)
-        rect = text.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 120))
-        self.surface.blit(text, rect)
+        key = (message, elapsed_time, score, powerup, movecount)
+        if self.message_key != key:
+            self.message_screen = self.compose_message(*key)
+            self.message_key = key
+        self.surface.blit(self.message_screen, (0, 0))
+        self.full_redraw = True  # the board has to be repainted after this screen
+        pygame.display.flip()
+
+    def compose_message(self, message, elapsed_time, score, powerup, movecount):
+        """Render the game over screen once per result; it is only re-blitted afterwards."""
+        screen = pygame.Surface(self.surface.get_size()).convert()
+        screen.fill(WHITE)
+        text = self.text.render(self.font, message, BLACK)
+        rect = text.get_rect(center=(self.width // 2, self.height // 2 - 120))
+        screen.blit(text, rect)
 
         if elapsed_time is not None:
-            time_text = self.font.render(f"Time Used: {elapsed_time}s", True, BLACK)
-            time_rect = time_text.get_rect(center=(WIDTH // 2, HEIGHT // 2-80))
-            self.surface.blit(time_text, time_rect)
+            time_text = self.text.render(self.font, f"Time Used: {elapsed_time}s", BLACK)
+            time_rect = time_text.get_rect(center=(self.width // 2, self.height // 2-80))
+            screen.blit(time_text, time_rect)
         
         if powerup is not None:
-            powerup_text = self.font.render(f"Power-up collected: {powerup} each", True, BLACK)
-            powerup_rect = powerup_text.get_rect(center=(WIDTH // 2, HEIGHT // 2-40))
-            self.surface.blit(powerup_text, powerup_rect)
+            powerup_text = self.text.render(self.font, f"Power-up collected: {powerup} each", BLACK)
+            powerup_rect = powerup_text.get_rect(center=(self.width // 2, self.height // 2-40))
+            screen.blit(powerup_text, powerup_rect)
         
         if score is not None:
-            score_text = self.font.render(f"Score: {score}", True, BLACK)
-            score_rect = score_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 ))
-            self.surface.blit(score_text, score_rect)
+            score_text = self.text.render(self.font, f"Score: {score}", BLACK)
+            score_rect = score_text.get_rect(center=(self.width // 2, self.height // 2 ))
+            screen.blit(score_text, score_rect)
         if movecount is not None:
-            move_text = self.font.render(f"You moved: {movecount} time", True, BLACK)
-            move_rect = move_text.get_rect(center=(WIDTH // 2, HEIGHT // 2+40))
-            self.surface.blit(move_text, move_rect)
+            move_text = self.text.render(self.font, f"You moved: {movecount} time", BLACK)
+            move_rect = move_text.get_rect(center=(self.width // 2, self.height // 2+40))
+            screen.blit(move_text, move_rect)
 
         # Draw Try Again button
-        try_again_button = pygame.Rect(WIDTH // 2 - 100, HEIGHT // 2 + 80, 200, 50)
-        pygame.draw.rect(self.surface, (0, 255, 0), try_again_button)
-        try_again_text = self.font.render("Try Again", True, BLACK)
-        self.surface.blit(try_again_text, try_again_button.move(90, 10))
-        
-
-        pygame.display.flip()
+        try_again_button = pygame.Rect(self.width // 2 - 100, self.height // 2 + 80, 200, 50)
+        pygame.draw.rect(screen, (0, 255, 0), try_again_button)
+        try_again_text = self.text.render(self.font, "Try Again", BLACK)
+        screen.blit(try_again_text, try_again_button.move(90, 10))
+        return screen
 
 
 
 
     def restart_game(self):
-        self.player = Player(position=(0, 0))
-        self.dragon = Dragon(position=(random.randint(0, BOARD_SIZE - 1),
-                                        random.randint(0, BOARD_SIZE - 1)))
-        self.fireballs = []
-        self.fireball_randoms = []
-        self.final_time = []
-        self.start_time = pygame.time.get_ticks()
-        self.game_over = False
-        self.win = False
-        self.powerups_collected = 0
-        self.score = 5000
-        self.move_count = 0
+        # A fresh seed per run keeps every run replayable on its own
+        self.sim.reset(seed=self.sim.rng.getrandbits(64))
         self.show_intro = False
+        self.scheduler.reset()
+        self.input.clear()
        
     def handle_intro_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+                self.quit()
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if self.start_button.collidepoint(event.pos):
                     self.show_intro = False
-                    #self.start_time = pygame.time.get_ticks()  # Start game timer
 
 
     def run(self):
         while True:
+            self.run_frame()
+
+    def quit(self):
+        if self.recorder is not None and not self.sim.game_over:
+            self.recorder.finish(self.sim)  # keep the unfinished run for bug reports
+        if self.telemetry is not None:
+            self.telemetry.close()  # flush the runs still queued
+        pygame.quit()
+        sys.exit()
+
+    def run_frame(self):
+        if self.show_intro:
+            # Draw before waiting so the first frame is not held back a tick
+            self.handle_intro_events()
+            self.introduction_screen()
             self.clock.tick(FPS)
-           
-            if self.show_intro:
-                self.handle_intro_events()
-                self.introduction_screen()
-            elif not self.game_over:
-                self.handle_events()
+            self.scheduler.reset()  # play starts with an empty accumulator
+        elif not self.sim.game_over:
+            self.clock.tick(self.render_fps)
+            profiler = self.profiler
+            start = profiler.clock()
+            self.handle_events()
+            profiler.record("handle_events", start)
+            # Run the simulation ticks that are due, then render
+            for _ in range(self.scheduler.advance()):
+                start = profiler.clock()
+                if not self.input.immediate:
+                    self.apply_queued_move()
                 self.update_game()
-                self.draw_game()
-            
-            else:                                
-                
-                y = pygame.time.get_ticks()
-                self.final_time.append(y)
-                
-                
-
-                final_time = (self.final_time[0] - self.start_time) // 1000
-                if self.win:
-                    self.display_message("You Win! The Dragon have been slained!", final_time, self.score+3000, self.powerups_collected, self.move_count)
-                else:
-                    self.display_message("Game Over! You let the Dragon escape", final_time, self.score, self.powerups_collected, self.move_count)
-
-                self.handle_gameover_events()
-
-
-                  
-               
-                    
+                profiler.record("update_game", start)
+                self.scheduler.tick_done()
+                if self.sim.game_over:
+                    break
+            profiler.count("fireballs", len(self.sim.fireballs))
+            profiler.count("random_fireballs", len(self.sim.fireball_randoms))
+            start = profiler.clock()
+            self.draw_game()
+            profiler.record("draw_game", start)
+            self.input.frame_displayed()
+        else:
+            self.clock.tick(FPS)
+            sim = self.sim
+            if sim.win:
+                self.display_message("You Win! The Dragon have been slained!", sim.elapsed_seconds(), sim.final_score(), sim.powerups_collected, sim.move_count)
+            else:
+                self.display_message("Game Over! You let the Dragon escape", sim.elapsed_seconds(), sim.final_score(), sim.powerups_collected, sim.move_count)
 
-                    # Wait for the user to click Try Again button
-                   # self.game_over = True  # Stop game loop when it's over
+            self.handle_gameover_events()
 
     
 
 if __name__ == "__main__":
-    Game().run()
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO if "--verbose" in sys.argv else logging.WARNING,
+                        format="%(message)s")
+    board_size = int(sys.argv[sys.argv.index("--board") + 1]) if "--board" in sys.argv else BOARD_SIZE
+    Game(config=SimConfig(board_size=board_size),
+         render_mode="raster" if "--raster" in sys.argv else "rects",
+         immediate_input="--immediate" in sys.argv,
+         trace="--trace" in sys.argv,
+         telemetry=TelemetryWriter("data.csv",
+                                   events_path="events.csv" if "--events" in sys.argv else None),
+         record="last_replay.sdr").run()
@@ -0,0 +1,59 @@
+import threading
+import time
+
+import pygame
+
+from profiler import log
+
+
+class BackgroundMusic:
+    """The soundtrack, loaded on a background thread.
+
+    The mixer is initialized and the file decoded off the main thread, so the
+    first frame does not wait for the audio device. ``play`` and ``pause``
+    before the music is ready are remembered and applied once it is. If the
+    mixer or the file is unavailable the game stays silent: a warning is
+    logged and ``play`` / ``pause`` do nothing.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.ready = False
+        self.failed = False
+        self.load_ms = None
+        self.playing = False  # what the game wants, applied once loaded
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.load, name="music-loader", daemon=True)
+        self.thread.start()
+
+    def load(self):
+        start = time.perf_counter()
+        try:
+            pygame.mixer.init()
+            pygame.mixer.music.load(self.path)
+        except (pygame.error, OSError) as error:
+            log.warning("No music (%s), playing silently", error)
+            self.failed = True
+            return
+        self.load_ms = 1000 * (time.perf_counter() - start)
+        log.info("Music loaded in %.1f ms", self.load_ms)
+        with self.lock:
+            self.ready = True
+            if self.playing:
+                pygame.mixer.music.play()
+
+    def play(self):
+        with self.lock:
+            self.playing = True
+            if self.ready:
+                pygame.mixer.music.play()
+
+    def pause(self):
+        with self.lock:
+            self.playing = False
+            if self.ready:
+                pygame.mixer.music.pause()
+
+    def wait(self, timeout=None):
+        """Block until loading finished (or failed); True if the music is ready."""
+        self.thread.join(timeout)
+        return self.ready
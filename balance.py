@@ -0,0 +1,192 @@
+"""Monte Carlo balancing: play many headless games for every point of a parameter grid.
+
+Example, three dragon HPs times two cooldowns, 2000 games per point and bot::
+
+    python balance.py --set dragon_hp=6,10,14 --set fireball_cooldown=3,5 \
+        --policy chase,cautious --games 2000 --out balance.csv
+
+Any SimConfig field can be swept with ``--set``. The games are split into
+chunks that idle worker processes pick up one after the other, so no core
+waits for a slow one. Game ``i`` of grid point ``p`` always gets the same
+seed, however the chunks are scheduled. Finished runs are appended to the
+output CSV as they arrive, in the data.csv columns plus the parameters, so
+data_visualize.py can open it; a win rate / score / time summary per
+point is printed at the end. The summary is kept as running counts, so
+memory does not grow with the number of games.
+"""
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import Counter
+from dataclasses import asdict, fields
+
+from bots import POLICIES
+from simulation import Simulation, SimConfig
+from telemetry import RUN_FIELDS
+
+MAX_TICKS = 6000  # games still running after 10 minutes of game time are cut off
+CONFIG_FIELDS = [field.name for field in fields(SimConfig)]
+BOT_SEED_SALT = 0x9E3779B97F4A7C15  # keeps the bot's rng stream apart from the game's
+
+
+def game_seed(seed, point, game):
+    """Seed of one game, independent of which worker plays it."""
+    return (seed << 40) ^ (point << 24) ^ game
+
+
+def play(config, policy, seed, max_ticks=MAX_TICKS):
+    """Play one game to the end and return its data.csv row."""
+    sim = Simulation(seed, config=config)
+    bot_rng = random.Random(seed ^ BOT_SEED_SALT)
+    choose = POLICIES[policy]
+    step = sim.step
+    while not sim.game_over and sim.tick < max_ticks:
+        step(*choose(sim, bot_rng))
+    result = sim.result()
+    if not sim.game_over:
+        result["game_result"] = "Timeout"
+    return result
+
+
+def play_chunk(task):
+    """Worker entry point: play games ``first``..``first + count - 1`` of one grid point."""
+    point, config, policy, seed, first, count, max_ticks = task
+    config = SimConfig(**config)
+    return point, [play(config, policy, game_seed(seed, point, game), max_ticks)
+                   for game in range(first, first + count)]
+
+
+def parse_grid(settings):
+    """["dragon_hp=6,10", ...] -> list of {field: value} for every combination."""
+    axes = {}
+    for setting in settings:
+        name, _, values = setting.partition("=")
+        if name not in CONFIG_FIELDS:
+            raise ValueError(f"unknown parameter {name!r}, choose from {', '.join(CONFIG_FIELDS)}")
+        axes[name] = [int(value) for value in values.split(",")]
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+def counted_percentile(counts, q):
+    """timestep.percentile of the values in the Counter ``counts`` (value -> occurrences)."""
+    total = sum(counts.values())
+    if not total:
+        return 0.0
+    rank = min(total - 1, max(0, round(q / 100 * (total - 1))))
+    seen = 0
+    for value in sorted(counts):
+        seen += counts[value]
+        if seen > rank:
+            return value
+
+
+class PointStats:
+    """Running totals of the games of one grid point, enough for its summary."""
+    def __init__(self):
+        self.games = 0
+        self.wins = 0
+        self.timeouts = 0
+        self.scores = Counter()  # score -> games
+        self.times = Counter()  # time -> games
+
+    def add(self, rows):
+        for row in rows:
+            self.games += 1
+            self.wins += row["game_result"] == "Win"
+            self.timeouts += row["game_result"] == "Timeout"
+            self.scores[row["score"]] += 1
+            self.times[row["time"]] += 1
+
+    def summary(self):
+        scores, times = self.scores, self.times
+        return {
+            "games": self.games,
+            "win_rate": self.wins / self.games,
+            "timeouts": self.timeouts,
+            "score_mean": sum(score * games for score, games in scores.items()) / self.games,
+            "score_p10": counted_percentile(scores, 10),
+            "score_p50": counted_percentile(scores, 50),
+            "score_p90": counted_percentile(scores, 90),
+            "time_mean": sum(time * games for time, games in times.items()) / self.games,
+            "time_p90": counted_percentile(times, 90),
+        }
+
+
+def run_sweep(grid, policies, games, out, workers=None, chunk=50, seed=0,
+              max_ticks=MAX_TICKS):
+    """Play ``games`` games per (grid point, policy) and return the summary per point.
+
+    Rows are streamed to the CSV ``out`` (overwritten) as chunks finish.
+    """
+    points = []
+    for overrides in grid:
+        for policy in policies:
+            config = asdict(SimConfig(**overrides))
+            points.append((overrides, policy, config))
+    tasks = [(point, config, policy, seed, first, min(chunk, games - first), max_ticks)
+             for point, (_, policy, config) in enumerate(points)
+             for first in range(0, games, chunk)]
+    stats = [PointStats() for _ in points]
+
+    with open(out, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(RUN_FIELDS + ["policy"] + CONFIG_FIELDS)
+        with multiprocessing.Pool(workers) as pool:
+            for point, results in pool.imap_unordered(play_chunk, tasks):
+                _, policy, config = points[point]
+                extra = [policy] + [config[name] for name in CONFIG_FIELDS]
+                writer.writerows([result[field] for field in RUN_FIELDS] + extra
+                                 for result in results)
+                stats[point].add(results)
+
+    return [dict(overrides, policy=policy, **point_stats.summary())
+            for (overrides, policy, _), point_stats in zip(points, stats)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--set", action="append", default=[], metavar="FIELD=V1,V2,...",
+                        help="SimConfig field to sweep (repeatable)")
+    parser.add_argument("--policy", default="cautious",
+                        help=f"comma separated bots: {', '.join(POLICIES)} (default cautious)")
+    parser.add_argument("--games", type=int, default=1000, help="games per grid point and bot")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--chunk", type=int, default=50, help="games per work item")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-ticks", type=int, default=MAX_TICKS)
+    parser.add_argument("--out", default="balance.csv")
+    args = parser.parse_args(argv)
+
+    policies = args.policy.split(",")
+    for policy in policies:
+        if policy not in POLICIES:
+            parser.error(f"unknown policy {policy!r}")
+    try:
+        grid = parse_grid(args.set)
+    except ValueError as error:
+        parser.error(str(error))
+
+    start = time.perf_counter()
+    summary = run_sweep(grid, policies, args.games, args.out, args.workers, args.chunk,
+                        args.seed, args.max_ticks)
+    elapsed = time.perf_counter() - start
+
+    names = [name for name in summary[0] if name not in ("games",)]
+    print("  ".join(f"{name:>10}" for name in names))
+    for point in summary:
+        print("  ".join(f"{point[name]:>10.3f}" if isinstance(point[name], float)
+                        else f"{point[name]:>10}" for name in names))
+    total = sum(point["games"] for point in summary)
+    print(f"{total} games on {args.workers} workers in {elapsed:.1f} s "
+          f"({total / elapsed:,.0f} games/s), runs saved to {args.out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
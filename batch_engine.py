@@ -0,0 +1,219 @@
+"""Vectorized engine that steps many independent games of Slay the Dragon at once.
+
+Every game lives in one row of a set of NumPy arrays and ``BatchSimulation.step``
+advances all of them with the same rules as ``simulation.Simulation``:
+
+* straight fireballs are stored in a ring of shot groups (four fireballs per
+  shot) with positions, direction vectors and a validity mask,
+* random fireballs are stored in a ring indexed by ``tick % (MAX_LIFETIME + 1)``
+  so a slot is only reused after its previous fireball has burnt out,
+* finished games are frozen and keep their result until ``reset``.
+
+Randomness comes from a NumPy generator, so runs are reproducible from the seed
+but do not follow the same random stream as ``Simulation``.
+"""
+import numpy as np
+
+from simulation import FPS, SimConfig
+
+# Action codes accepted by step(): stay, up, down, left, right
+ACTIONS = np.array([(0, 0), (0, -1), (0, 1), (-1, 0), (1, 0)], dtype=np.int32)
+FIREBALL_DIRECTIONS = np.array([(0, -1), (0, 1), (-1, 0), (1, 0)], dtype=np.int32)
+MIN_LIFETIME, MAX_LIFETIME = 10, 30
+
+
+class BatchSimulation:
+    def __init__(self, n_games, seed=None, config=None):
+        self.n = n_games
+        self.config = config or SimConfig()
+        self.rng = np.random.default_rng(seed)
+        size = self.config.board_size
+        # A shot burns out after at most board_size ticks and the dragon shoots
+        # at most once per cooldown period, so this many groups never collide.
+        period = max(self.config.fireball_cooldown, 1)
+        self.shot_groups = -(-size // period) + 1
+        self.random_per_tick = max(self.config.random_fireball_base, 0)
+        self.random_groups = MAX_LIFETIME + 1
+        self.reset()
+
+    def reset(self):
+        n, cfg = self.n, self.config
+        self.tick = np.zeros(n, dtype=np.int32)
+        self.player = np.zeros((n, 2), dtype=np.int32)
+        self.dragon = self.random_cells(n)
+        self.hp = np.full(n, cfg.dragon_hp, dtype=np.int32)
+        self.cooldown = np.zeros(n, dtype=np.int32)
+        self.shots = np.zeros(n, dtype=np.int32)
+
+        slots = self.shot_groups * 4
+        self.fireball_pos = np.zeros((n, slots, 2), dtype=np.int32)
+        self.fireball_dir = np.zeros((n, slots, 2), dtype=np.int32)
+        self.fireball_valid = np.zeros((n, slots), dtype=bool)
+
+        slots = self.random_groups * self.random_per_tick
+        self.random_pos = np.zeros((n, slots, 2), dtype=np.int32)
+        self.random_life = np.zeros((n, slots), dtype=np.int32)
+
+        self.powerup = np.zeros((n, 2), dtype=np.int32)
+        self.powerup_active = np.zeros(n, dtype=bool)
+        self.powerup_spawn_tick = np.zeros(n, dtype=np.int32)
+        self.invincible = np.zeros(n, dtype=bool)
+        self.invincible_tick = np.zeros(n, dtype=np.int32)
+
+        self.game_over = np.zeros(n, dtype=bool)
+        self.win = np.zeros(n, dtype=bool)
+        self.score = np.full(n, cfg.start_score, dtype=np.int32)
+        self.move_count = np.zeros(n, dtype=np.int32)
+        self.powerups_collected = np.zeros(n, dtype=np.int32)
+
+    def random_cells(self, count):
+        return self.rng.integers(0, self.config.board_size, size=(count, 2), dtype=np.int32)
+
+    def step(self, actions):
+        """Advance every unfinished game by one tick.
+
+        ``actions`` is either an array of action codes (see ACTIONS) or an
+        ``(n, 2)`` array of dx, dy moves.
+        """
+        cfg = self.config
+        size = cfg.board_size
+        actions = np.asarray(actions)
+        delta = ACTIONS[actions] if actions.ndim == 1 else actions.astype(np.int32)
+        live = ~self.game_over
+
+        # Player movement
+        target = self.player + delta
+        inside = ((target >= 0) & (target < size)).all(axis=1)
+        moved = live & delta.any(axis=1) & inside
+        self.move_count += moved
+        self.player = np.where(moved[:, None], target, self.player)
+
+        # Dragon takes damage and teleports
+        hit_dragon = live & (self.player == self.dragon).all(axis=1)
+        self.hp -= hit_dragon
+        teleports = np.flatnonzero(hit_dragon)
+        self.dragon[teleports] = self.random_cells(len(teleports))
+        won = hit_dragon & (self.hp <= 0)
+        self.game_over |= won
+        self.win |= won
+
+        self.cooldown -= live & (self.cooldown > 0)
+
+        # Straight fireballs, four per shot, while 5 <= hp < 8
+        shoot = live & (self.hp >= 5) & (self.hp < 8) & (self.cooldown == 0)
+        shooters = np.flatnonzero(shoot)
+        if len(shooters):
+            self.cooldown[shooters] = cfg.fireball_cooldown
+            slots = (self.shots[shooters] % self.shot_groups * 4)[:, None] + np.arange(4)
+            self.fireball_pos[shooters[:, None], slots] = self.dragon[shooters][:, None, :]
+            self.fireball_dir[shooters[:, None], slots] = FIREBALL_DIRECTIONS
+            self.fireball_valid[shooters[:, None], slots] = True
+            self.shots[shooters] += 1
+
+        # Random fireballs, (base - hp) per tick while hp < 5
+        k = self.random_per_tick
+        if k:
+            count = np.where(live & (self.hp < 5), cfg.random_fireball_base - self.hp, 0)
+            spawners = np.flatnonzero(count > 0)
+            if len(spawners):
+                slots = (self.tick[spawners] % self.random_groups * k)[:, None] + np.arange(k)
+                used = np.arange(k) < count[spawners][:, None]
+                life = self.rng.integers(MIN_LIFETIME, MAX_LIFETIME + 1,
+                                         size=(len(spawners), k), dtype=np.int32)
+                pos = self.rng.integers(0, size, size=(len(spawners), k, 2), dtype=np.int32)
+                self.random_life[spawners[:, None], slots] = np.where(used, life, 0)
+                self.random_pos[spawners[:, None], slots] = pos
+
+        # Move straight fireballs, dropping the ones that leave the board.
+        # A fireball that fails to move stays lethal on its edge cell this tick.
+        # Only games that have fireballs in flight are touched.
+        hit = np.zeros(self.n, dtype=bool)
+        games = np.flatnonzero(live & self.fireball_valid.any(axis=1))
+        if len(games):
+            valid = self.fireball_valid[games]
+            pos = self.fireball_pos[games]
+            target = pos + self.fireball_dir[games]
+            inside = ((target >= 0) & (target < size)).all(axis=2)
+            pos = np.where((valid & inside)[:, :, None], target, pos)
+            self.fireball_pos[games] = pos
+            self.fireball_valid[games] = valid & inside
+            player = self.player[games][:, None, :]
+            hit[games] = (valid & (pos == player).all(axis=2)).any(axis=1)
+
+        # Random fireballs are checked before they age
+        games = np.flatnonzero(live & (self.hp < 5))
+        if k and len(games):
+            life = self.random_life[games]
+            burning = life > 0
+            player = self.player[games][:, None, :]
+            hit[games] |= (burning & (self.random_pos[games] == player).all(axis=2)).any(axis=1)
+            self.random_life[games] = life - burning
+
+        hit &= live & ~self.invincible
+        self.game_over |= hit
+        self.win &= ~hit
+
+        # Power-up pickup
+        picked = live & self.powerup_active & (self.player == self.powerup).all(axis=1)
+        self.invincible |= picked
+        self.invincible_tick = np.where(picked, self.tick, self.invincible_tick)
+        self.score = np.where(picked, np.maximum(0, self.score - cfg.powerup_cost), self.score)
+        self.powerup_active &= ~picked
+        self.powerups_collected += picked
+
+        # Invincibility duration
+        ended = live & self.invincible & (self.tick - self.invincible_tick >= cfg.invincible_ticks)
+        self.invincible &= ~ended
+
+        # Random power-up spawn (1 in powerup_chance per tick)
+        roll = self.rng.integers(1, cfg.powerup_chance + 1, size=self.n) == 1
+        self.spawn_powerups(live & ~self.powerup_active & roll)
+
+        self.score -= live
+
+        # Forced power-up spawn every powerup_interval ticks
+        forced = live & ~self.powerup_active & (self.tick - self.powerup_spawn_tick >= cfg.powerup_interval)
+        self.spawn_powerups(forced)
+        self.powerup_spawn_tick = np.where(forced, self.tick, self.powerup_spawn_tick)
+
+        self.tick += live
+        return np.flatnonzero(live & self.game_over)
+
+    def spawn_powerups(self, mask):
+        spawned = np.flatnonzero(mask)
+        self.powerup[spawned] = self.random_cells(len(spawned))
+        self.powerup_active[spawned] = True
+
+    def run(self, policy, max_ticks=100000):
+        """Step until every game is over (or max_ticks), ``policy(batch)`` picks the actions."""
+        for _ in range(max_ticks):
+            if self.game_over.all():
+                break
+            self.step(policy(self))
+        return self.results()
+
+    def final_score(self):
+        return np.where(self.win, self.score + self.config.win_bonus, self.score)
+
+    def results(self, finished_only=True):
+        """Per-game results keyed by the data.csv column names."""
+        mask = self.game_over if finished_only else np.ones(self.n, dtype=bool)
+        return {
+            "game_result": np.where(self.win[mask], "Win", "Lose"),
+            "score": self.final_score()[mask],
+            "time": self.tick[mask] // FPS,
+            "power-up_collected": self.powerups_collected[mask],
+            "total_move": self.move_count[mask],
+        }
+
+    def result_rows(self, finished_only=True):
+        results = self.results(finished_only)
+        columns = list(results)
+        return [dict(zip(columns, values)) for values in zip(*(results[c].tolist() for c in columns))]
+
+
+def chase_policy(batch):
+    """Walk straight at the dragon, first along x then along y."""
+    dx = np.sign(batch.dragon[:, 0] - batch.player[:, 0])
+    dy = np.where(dx == 0, np.sign(batch.dragon[:, 1] - batch.player[:, 1]), 0)
+    return np.stack([dx, dy], axis=1)
@@ -0,0 +1,465 @@
+"""Benchmark suite for Slay the Dragon.
+
+Run with ``python benchmark.py``; ``--json results.json`` saves the numbers
+and ``--compare results.json`` flags metrics that got slower since. The game
+loop and rendering need pygame and run with the dummy SDL video/audio
+drivers, so no window is opened. Every case uses a fixed seed.
+"""
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+from simulation import Simulation
+
+MOVES = [(0, 0), (0, -1), (0, 1), (-1, 0), (1, 0)]
+
+
+def load_game_module():
+    """Import Slaythedragon1.1.py (its file name is not a valid module name)."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Slaythedragon1.1.py")
+    spec = importlib.util.spec_from_file_location("slaythedragon", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def mute_music(pygame):
+    """The soundtrack is not shipped with the repo and is not part of the measured loop."""
+    pygame.mixer.music.load = lambda *args: None
+    pygame.mixer.music.play = lambda *args: None
+    pygame.mixer.music.pause = lambda *args: None
+
+
+def random_moves(count, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice(MOVES) for _ in range(count)]
+
+
+def bench_headless(ticks=100000, seed=0):
+    """Ticks per second of Simulation.step, restarting whenever a game ends."""
+    moves = random_moves(ticks, seed)
+    sim = Simulation(seed)
+    start = time.perf_counter()
+    for dx, dy in moves:
+        if sim.game_over:
+            sim.reset()
+        sim.step(dx, dy)
+    return ticks / (time.perf_counter() - start)
+
+
+def bench_phase(hp, board_size=25, ticks=20000, seed=0):
+    """Ticks per second with the dragon held at ``hp``.
+
+    HP 5-7 is the straight fireball phase, HP 1-4 the random fireball storm.
+    The knight is kept invincible so the run never ends.
+    """
+    from simulation import SimConfig
+    sim = Simulation(seed, config=SimConfig(board_size=board_size))
+    sim.dragon.hp = hp
+    moves = random_moves(ticks, seed)
+    start = time.perf_counter()
+    for dx, dy in moves:
+        sim.invincible = True
+        sim.invincible_tick = sim.tick
+        sim.step(dx, dy)
+        sim.dragon.hp = hp
+        sim.game_over = False
+    return ticks / (time.perf_counter() - start)
+
+
+def bench_storm(board_size=25, ticks=20000, seed=0):
+    """Ticks per second while the dragon (HP 1) fills the board with random fireballs."""
+    return bench_phase(1, board_size, ticks, seed)
+
+
+def bench_memory(ticks=5000, seed=0):
+    """Allocations and garbage collections during a dense fireball storm."""
+    sim = Simulation(seed)
+    sim.dragon.hp = 0  # six random fireballs per tick
+    moves = random_moves(ticks, seed)
+    gc.collect()
+    collections = [stat["collections"] for stat in gc.get_stats()]
+    tracemalloc.start()
+    start = tracemalloc.take_snapshot()
+    for dx, dy in moves:
+        sim.invincible = True
+        sim.invincible_tick = sim.tick
+        sim.step(dx, dy)
+        sim.dragon.hp = 0
+        sim.game_over = False
+    stats = tracemalloc.take_snapshot().compare_to(start, "filename")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "live_fireballs": len(sim.fireball_randoms),
+        "allocated_blocks": sum(stat.count_diff for stat in stats if stat.count_diff > 0),
+        "peak_kib": peak / 1024,
+        "gc_collections": [stat["collections"] - before
+                           for stat, before in zip(gc.get_stats(), collections)],
+    }
+
+
+def bench_batch(n_games=10000, seed=0):
+    """Game ticks per second of BatchSimulation running chase bots to the end."""
+    from batch_engine import BatchSimulation, chase_policy
+    batch = BatchSimulation(n_games, seed)
+    start = time.perf_counter()
+    batch.run(chase_policy)
+    return batch.tick.sum() / (time.perf_counter() - start)
+
+
+def bench_draw(board_size=25, hp=1, frames=300, dirty=True, seed=0, render_mode="rects"):
+    """Mean draw_game time in ms with the dragon held at ``hp`` (HP 1 fills the
+    board with random fireballs). ``dirty=False`` repaints and flips the whole
+    window every frame, like the game did before dirty rectangles.
+    """
+    from simulation import SimConfig
+    module = load_game_module()
+    mute_music(module.pygame)
+    game = module.Game(seed, config=SimConfig(board_size=board_size), render_mode=render_mode)
+    sim = game.sim
+    sim.dragon.hp = hp
+    total = 0.0
+    fireballs = 0
+    for dx, dy in random_moves(frames, seed):
+        sim.invincible = True
+        sim.invincible_tick = sim.tick
+        sim.step(dx, dy)
+        sim.dragon.hp = hp
+        sim.game_over = False
+        game.full_redraw = game.full_redraw or not dirty
+        start = time.perf_counter()
+        game.draw_game()
+        total += time.perf_counter() - start
+        fireballs += len(sim.fireballs) + len(sim.fireball_randoms)
+    return {"frame_ms": 1000 * total / frames, "fireballs": fireballs / frames}
+
+
+def bench_screens(frames=300, seed=0):
+    """Mean ms per frame of the intro and game over screens."""
+    module = load_game_module()
+    mute_music(module.pygame)
+    game = module.Game(seed)
+    timings = {}
+    for name, draw in (("intro_ms", game.introduction_screen),
+                       ("game_over_ms", lambda: game.display_message(
+                           "Game Over! You let the Dragon escape", 12, 4880, 1, 97))):
+        start = time.perf_counter()
+        for _ in range(frames):
+            draw()
+        timings[name] = 1000 * (time.perf_counter() - start) / frames
+    return timings
+
+
+def bench_pacing(seconds=3.0, seed=0):
+    """Run the real frame loop (dummy display) and report the measured tick and frame pacing."""
+    module = load_game_module()
+    mute_music(module.pygame)
+    game = module.Game(seed)
+    game.show_intro = False
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        if game.sim.game_over:
+            game.restart_game()
+        game.sim.invincible = True
+        game.sim.invincible_tick = game.sim.tick
+        game.run_frame()
+    return game.scheduler.jitter()
+
+
+def bench_input_latency(seconds=3.0, immediate=False, presses_per_second=8, seed=0):
+    """Post arrow key presses into the real frame loop and report input-to-display latency."""
+    module = load_game_module()
+    mute_music(module.pygame)
+    pygame = module.pygame
+    game = module.Game(seed, immediate_input=immediate)
+    game.show_intro = False
+    rng = random.Random(seed)
+    keys = list(module.KEY_MOVES)
+    end = time.perf_counter() + seconds
+    next_press = time.perf_counter()
+    while time.perf_counter() < end:
+        if game.sim.game_over:
+            game.restart_game()
+        game.sim.invincible = True
+        game.sim.invincible_tick = game.sim.tick
+        if time.perf_counter() >= next_press:
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=rng.choice(keys)))
+            next_press += rng.expovariate(presses_per_second)
+        game.run_frame()
+    return game.input.latency()
+
+
+def bench_replay(ticks=6000, seed=0, repeat=5):
+    """Replay of a recorded 10-minute session (random moves): ms per replay and ticks/s.
+
+    Checksums are verified, as they are by ``python replay.py``.
+    """
+    from replay import Replay, ReplayRecorder, run_replay
+    sim = Simulation(seed)
+    recorder = ReplayRecorder().attach(sim)
+    for dx, dy in random_moves(ticks, seed):
+        if sim.game_over:
+            break
+        sim.step(dx, dy)
+    recorder.finish(sim)
+    data = recorder.replay.to_bytes()
+    replay = Replay.from_bytes(data)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        run_replay(replay)
+    elapsed = (time.perf_counter() - start) / repeat
+    return {"ticks": replay.ticks, "bytes": len(data), "replay_ms": elapsed * 1000,
+            "ticks_per_s": replay.ticks / elapsed}
+
+
+def bench_coupled(ticks=2000, seed=0):
+    """Ticks per second of the pygame loop (update + draw) without the FPS cap."""
+    module = load_game_module()
+    mute_music(module.pygame)
+    game = module.Game(seed)
+    game.show_intro = False
+    moves = random_moves(ticks, seed)
+    start = time.perf_counter()
+    for dx, dy in moves:
+        if game.sim.game_over:
+            game.restart_game()
+        game.update_game(dx, dy)
+        game.draw_game()
+    return ticks / (time.perf_counter() - start)
+
+
+def bench_planner(hp=1, ticks=3000, seed=0):
+    """ms per planner.Planner decision with the dragon held at ``hp`` (HP 1 is the storm)."""
+    from planner import Planner
+    sim = Simulation(seed)
+    planner = Planner()
+    timings = []
+    for _ in range(ticks):
+        sim.dragon.hp = hp
+        sim.game_over = False
+        start = time.perf_counter()
+        move = planner(sim)
+        timings.append(time.perf_counter() - start)
+        sim.step(*move)
+    timings = [timing * 1000 for timing in timings]
+    return {"p50_ms": statistics.median(timings), "p99_ms": sorted(timings)[int(0.99 * len(timings))]}
+
+
+def bench_startup(repeat=5, seed=0):
+    """ms from a fresh interpreter to the first frame, and the phases of a warm start.
+
+    The cold start (import, Game.__init__, intro screen on the window) is
+    measured in a child process so nothing is cached yet. The rest are
+    medians of ``repeat`` starts in this process: Game.__init__, the time
+    to the first frame and every phase of Game.startup.
+    """
+    code = ("import time; start = time.perf_counter(); import benchmark; "
+            "module = benchmark.load_game_module(); benchmark.mute_music(module.pygame); "
+            "module.Game(0).introduction_screen(); print((time.perf_counter() - start) * 1000)")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    cold_ms = float(output.stdout.split()[-1])
+    module = load_game_module()
+    mute_music(module.pygame)
+    init, first_frame, phases = [], [], {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        game = module.Game(seed)
+        init.append(time.perf_counter() - start)
+        game.introduction_screen()
+        first_frame.append(time.perf_counter() - start)
+        for phase, ms in game.startup.items():
+            phases.setdefault(phase, []).append(ms)
+        game.music.wait()
+    results = {"cold_start_ms": cold_ms,
+               "game_init_ms": 1000 * statistics.median(init),
+               "first_frame_ms": 1000 * statistics.median(first_frame)}
+    for phase, timings in phases.items():
+        results[f"phase_{phase}_ms"] = statistics.median(timings)
+    return results
+
+
+def make_runs_csv(rows, path, seed=0):
+    """Write ``rows`` runs to ``path``, resampled from the shipped data.csv."""
+    import pandas as pd
+    here = os.path.dirname(os.path.abspath(__file__))
+    data = pd.read_csv(os.path.join(here, "data.csv"))
+    if rows != len(data):
+        data = data.sample(rows, replace=True, random_state=seed)
+    data.to_csv(path, index=False)
+
+
+def bench_plots(rows, seed=0):
+    """ms to read a data.csv of ``rows`` runs and to build and render its plots.
+
+    Reads the file with run_log.RunLog like data_visualize does, then uses
+    data_visualize.build_figures on the Agg backend, i.e. create_plots
+    without embedding the finished figures in the Tk window. ``replot_ms``
+    is a reload: the same figures updated in place and drawn again.
+    ``cached_load_ms`` reopens the unchanged file from its summary sidecar,
+    ``store_load_ms`` computes the stats from the file converted to a
+    run_store instead.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import data_visualize
+    from run_log import RunLog
+    from run_store import RunStore, convert
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "data.csv")
+        make_runs_csv(rows, path, seed)
+        start = time.perf_counter()
+        log = RunLog(path)
+        log.update()
+        load = time.perf_counter() - start
+        start = time.perf_counter()
+        RunLog(path).update()
+        cached_load = time.perf_counter() - start
+        convert(path, os.path.join(directory, "data.sdrc"))
+        start = time.perf_counter()
+        RunStore(os.path.join(directory, "data.sdrc")).update()
+        store_load = time.perf_counter() - start
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)  # seaborn palette deprecation
+        plots = data_visualize.Plots()
+        plots.update(log.stats)
+        for figure, _ in plots.figures:
+            figure.canvas.draw()
+        plot = time.perf_counter() - start
+        start = time.perf_counter()
+        plots.update(log.stats)
+        for figure, _ in plots.figures:
+            figure.canvas.draw()
+        replot = time.perf_counter() - start
+    for figure, _ in plots.figures:
+        plt.close(figure)
+    return {"load_ms": 1000 * load, "cached_load_ms": 1000 * cached_load,
+            "store_load_ms": 1000 * store_load, "plot_ms": 1000 * plot, "replot_ms": 1000 * replot}
+
+
+def run_suite(quick=False):
+    """Run every benchmark and return {metric name: value}.
+
+    Metric names end in their unit: ``_per_s`` is better when higher,
+    everything else (``_ms``, ``_kib``, ``_blocks``, ``_collections``) when
+    lower. ``quick`` shrinks the slowest cases (largest boards, millions of
+    CSV rows).
+    """
+    results = {}
+    sizes = (25, 250) if quick else (25, 250, 2500)
+
+    def report(name, value):
+        results[name] = value
+        print(f"{name:<48} {value:>14,.2f}")
+
+    report("headless.ticks_per_s", bench_headless())
+    report("phase.hp10.no_fireballs.ticks_per_s", bench_phase(10))
+    for size in sizes:
+        report(f"phase.hp6.straight.{size}.ticks_per_s", bench_phase(6, size))
+        report(f"phase.hp1.storm.{size}.ticks_per_s", bench_storm(size))
+    memory = bench_memory()
+    report("storm.memory.peak_kib", memory["peak_kib"])
+    report("storm.memory.allocated_blocks", memory["allocated_blocks"])
+    for generation, collections in enumerate(memory["gc_collections"]):
+        report(f"storm.memory.gc_gen{generation}_collections", collections)
+    for hp in (10, 6, 1):
+        for name, value in bench_planner(hp).items():
+            report(f"planner.hp{hp}.decision_{name}", value)
+    replay = bench_replay()
+    report("replay.6000_ticks_ms", replay["replay_ms"])
+    try:
+        report("batch.ticks_per_s", bench_batch())
+        from env import steps_per_second
+        report("env.single.steps_per_s", steps_per_second(n_workers=0))
+        report("env.vector.steps_per_s", steps_per_second())
+    except ImportError:
+        print("numpy is not installed, skipping the batch engine")
+
+    try:
+        import pygame  # noqa: F401
+    except ImportError:
+        print("pygame is not installed, skipping the game loop and rendering")
+    else:
+        report("coupled.ticks_per_s", bench_coupled())
+        for name, value in bench_startup().items():
+            report(f"startup.{name}", value)
+        for name, value in bench_screens().items():
+            report(f"screens.{name}", value)
+        for size, hp in ((25, 10), (25, 6), (25, 1), (100, 1), (5000, 6), (5000, 1)):
+            for mode, kwargs in (("full", {"dirty": False}), ("dirty", {}),
+                                 ("raster", {"render_mode": "raster"})):
+                draw = bench_draw(size, hp, **kwargs)
+                report(f"draw.{size}.hp{hp}.{mode}.frame_ms", draw["frame_ms"])
+        for immediate in (False, True):
+            latency = bench_input_latency(immediate=immediate)
+            report(f"input.{'immediate' if immediate else 'queued'}.p95_ms", latency["p95_ms"])
+
+    try:
+        import data_visualize  # noqa: F401
+    except ImportError:
+        print("pandas/matplotlib/seaborn are not installed, skipping the plots")
+    else:
+        for rows in ((50, 10000) if quick else (50, 10000, 100000, 1000000)):
+            for name, value in bench_plots(rows).items():
+                report(f"plots.{rows}.{name}", value)
+    return results
+
+
+def compare(results, baseline, threshold=0.10):
+    """Metrics at least ``threshold`` (a fraction) worse than in ``baseline``."""
+    regressions = []
+    for name, value in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        change = (before - value) / before if name.endswith("_per_s") else (value - before) / before
+        if change >= threshold:
+            regressions.append((name, before, value, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="skip the slowest cases")
+    parser.add_argument("--json", metavar="PATH", help="save the results to PATH")
+    parser.add_argument("--compare", metavar="PATH", help="flag regressions against a saved run")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slow-down counted as a regression (default 0.10)")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.quick)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"python": platform.python_version(), "platform": platform.platform(),
+                       "created": time.strftime("%Y-%m-%d %H:%M:%S"), "quick": args.quick,
+                       "results": results}, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, value, change in regressions:
+            print(f"REGRESSION {name}: {before:,.2f} -> {value:,.2f} ({change:+.0%} worse)")
+        if regressions:
+            return 1
+        print(f"no regressions against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""Scripted players for headless games.
+
+A policy is called once per tick as ``policy(sim, rng)`` and returns the
+(dx, dy) to pass to ``Simulation.step``. ``rng`` is the bot's own
+random.Random, so the bot's choices do not disturb the game's random stream.
+"""
+from planner import Planner
+from simulation import SHOT_DIRECTIONS
+
+STAY = (0, 0)
+
+
+def random_policy(sim, rng):
+    """Mash the arrow keys."""
+    return rng.choice(SHOT_DIRECTIONS)
+
+
+def chase_policy(sim, rng):
+    """Walk straight at the dragon, first along x then along y."""
+    (px, py), (tx, ty) = sim.player.position, sim.dragon.position
+    if px != tx:
+        return (1 if tx > px else -1), 0
+    return 0, (1 if ty > py else -1 if ty < py else 0)
+
+
+def cautious_policy(sim, rng):
+    """Chase the dragon but never step onto (or stay on) a cell known to burn next tick.
+
+    Moves that get closer to the dragon are tried first, then standing
+    still, then the other moves. Power-ups are picked up when they are
+    closer than the dragon.
+    """
+    px, py = sim.player.position
+    tx, ty = sim.dragon.position
+    if sim.powerup and not sim.invincible:
+        ux, uy = sim.powerup.position
+        if abs(ux - px) + abs(uy - py) < abs(tx - px) + abs(ty - py):
+            tx, ty = ux, uy
+    size = sim.config.board_size
+    distance = abs(tx - px) + abs(ty - py)
+    closer, other = [], []
+    for dx, dy in SHOT_DIRECTIONS:
+        x, y = px + dx, py + dy
+        if 0 <= x < size and 0 <= y < size:
+            (closer if abs(tx - x) + abs(ty - y) < distance else other).append((dx, dy))
+    rng.shuffle(other)
+    if sim.invincible:
+        return closer[0] if closer else STAY
+    for dx, dy in closer + [STAY] + other:
+        if sim.is_safe((px + dx, py + dy)):
+            return dx, dy
+    return closer[0] if closer else STAY
+
+
+POLICIES = {
+    "random": random_policy,
+    "chase": chase_policy,
+    "cautious": cautious_policy,
+    "planner": Planner(),  # keeps a danger map of the game it is playing
+}
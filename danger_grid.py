@@ -0,0 +1,58 @@
+from array import array
+
+CHUNK = 32  # cells per side of one chunk
+
+
+class DangerGrid:
+    """Number of random fireballs on every cell of the board.
+
+    The counts are updated as random fireballs spawn and burn out (they never
+    move), so asking whether a cell is lethal is a lookup no matter how many
+    are alive. The board is split into CHUNK x CHUNK chunks of unsigned 16 bit
+    counts (plus one slot with the chunk's total); a chunk is only held while
+    fireballs are on it, so a board thousands of cells wide costs memory for
+    the area that is burning only. Emptied chunks are all zero again and are
+    kept in a pool for reuse.
+    """
+    def __init__(self, size, chunk=CHUNK):
+        self.size = size
+        self.chunk = chunk
+        self.cells = chunk * chunk  # index of the total slot in a chunk
+        self.stride = -(-size // chunk)  # chunks per row
+        self.chunks = {}  # chunk number -> counts of its cells, then their total
+        self.pool = []
+        self.total = 0
+
+    def locate(self, position):
+        """(chunk number, index in the chunk) of a cell."""
+        x, y = position
+        chunk = self.chunk
+        return y // chunk * self.stride + x // chunk, y % chunk * chunk + x % chunk
+
+    def add(self, position):
+        x, y = position
+        chunk = self.chunk
+        key = y // chunk * self.stride + x // chunk
+        counts = self.chunks.get(key)
+        if counts is None:
+            counts = self.pool.pop() if self.pool else array("H", bytes(2 * self.cells + 2))
+            self.chunks[key] = counts
+        counts[y % chunk * chunk + x % chunk] += 1
+        counts[self.cells] += 1
+        self.total += 1
+
+    def remove(self, position):
+        x, y = position
+        chunk = self.chunk
+        key = y // chunk * self.stride + x // chunk
+        counts = self.chunks[key]
+        counts[y % chunk * chunk + x % chunk] -= 1
+        counts[self.cells] -= 1
+        self.total -= 1
+        if not counts[self.cells]:
+            self.pool.append(self.chunks.pop(key))
+
+    def is_lethal(self, position):
+        key, i = self.locate(position)
+        counts = self.chunks.get(key)
+        return counts is not None and counts[i] > 0
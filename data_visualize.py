@@ -1,112 +1,326 @@
+import sys
+import threading
+import time
 import tkinter as tk
-from tkinter import filedialog
+from tkinter import filedialog, ttk
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.colors import LogNorm
 import seaborn as sns
+from run_store import open_runs
+
+FOLLOW_MS = 1000  # how often a followed log is checked for new runs
+POLL_MS = 50  # how often the window checks on a running load
+SCORE_STATS = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+DENSITY_ROWS = 20000  # above this many runs the point plots are drawn as density grids
+DENSITY_BINS = 80  # grid cells per axis of the binned Total Moves vs Time plot
+
+frame = None  # the window's plot area, created by main()
+follow_var = None  # "Follow" checkbox
+status_var = None  # text next to the progress bar
+progress_bar = None
+plots = None  # the Plots shown in the window
+run_log = None  # RunLog (or RunStore) of the open file
+loading = None  # BackgroundLoad running, if any
+
+
+class BackgroundLoad:
+    """RunLog.update (or RunStore.update) on a worker thread, so the window stays responsive.
+
+    The Tk side polls ``progress`` and ``done``; ``cancel()`` stops the
+    worker after the block it is parsing.
+    """
+    def __init__(self, log):
+        self.log = log
+        self.started = time.perf_counter()
+        self.progress = (0, 0)  # bytes parsed, file size
+        self.rows = 0
+        self.error = None
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="csv-loader", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            self.rows = self.log.update(progress=self.report, cancel=self.stop)
+        except (OSError, ValueError) as error:  # shown in the window instead
+            self.error = error
+
+    def report(self, offset, size):
+        self.progress = (offset, size)
+
+    def cancel(self):
+        self.stop.set()
+
+    @property
+    def cancelled(self):
+        return self.stop.is_set()
+
+    @property
+    def done(self):
+        return not self.thread.is_alive()
+
 
 def load_csv():
     file_path = filedialog.askopenfilename()
     if file_path:
-        data = pd.read_csv(file_path)
-        create_plots(data)
-
-def create_plots(data):
-    for widget in frame.winfo_children():
-        widget.destroy()
-
-    fig_size = (4, 3)
-
-    # Pie Chart
-    fig1, ax1 = plt.subplots(figsize=fig_size)
-    result_counts = data['game_result'].value_counts()
-    ax1.pie(result_counts, labels=result_counts.index, autopct='%1.1f%%')
-    ax1.set_title("Game Results")
-    canvas1 = FigureCanvasTkAgg(fig1, master=frame)
-    canvas1.draw()
-    canvas1.get_tk_widget().grid(row=0, column=0, padx=5, pady=5)
-
-    # Score Histogram
-    # Score Box Plot
-    # Score Histogram
-    fig2, ax2 = plt.subplots(figsize=fig_size)
-    ax2.hist(data['score'], bins=10, color='skyblue')
-    ax2.set_title("Score Distribution")
-    ax2.set_xlabel("Score")
-    ax2.set_ylabel("Frequency")
-    canvas2 = FigureCanvasTkAgg(fig2, master=frame)
-    canvas2.draw()
-    canvas2.get_tk_widget().grid(row=0, column=1, padx=5, pady=5)
-
-
-
-    # Scatter: Total Moves vs Time
-    fig3, ax3 = plt.subplots(figsize=fig_size)
-    ax3.scatter(data['total_move'], data['time'], color='green')
-    ax3.set_title("Total Moves vs Time")
-    ax3.set_xlabel("Total Moves")
-    ax3.set_ylabel("Time (s)")
-    canvas3 = FigureCanvasTkAgg(fig3, master=frame)
-    canvas3.draw()
-    canvas3.get_tk_widget().grid(row=0, column=2, padx=5, pady=5)
-
-    # Power-ups Line
-    # Power-ups Collected vs Game Result
-    fig4, ax4 = plt.subplots(figsize=fig_size)
-    sns.stripplot(x='game_result', y='power-up_collected', data=data, ax=ax4, jitter=True, palette='Set2')
-    ax4.set_title("Power-ups Collected by Game Result")
-    ax4.set_xlabel("Game Result")
-    ax4.set_ylabel("Power-ups Collected")
-    canvas4 = FigureCanvasTkAgg(fig4, master=frame)
-    canvas4.draw()
-    canvas4.get_tk_widget().grid(row=1, column=0, padx=5, pady=5)
-
-
-    # Score Stats Table
-    # Score Statistics Table (with larger font)
-    fig5, ax5 = plt.subplots(figsize=(fig_size[0], 2)) 
-    ax5.axis('tight')
-    ax5.axis('off')
-    table_data = data['score'].describe().round(2).to_frame().T
-    table = ax5.table(cellText=table_data.values, colLabels=table_data.columns, loc='center', cellLoc='center')
-
-    
-    table.auto_set_font_size(False)
-    table.set_fontsize(8)  
-    table.scale(1.2, 1.5)  
-
-    canvas5 = FigureCanvasTkAgg(fig5, master=frame)
-    canvas5.draw()
-    canvas5.get_tk_widget().grid(row=1, column=1, padx=5, pady=5)
-
-
-# Main Window
-root = tk.Tk()
-root.title("Game Data Analysis")
-
-# Make window resizable
-root.geometry("1200x800")
-root.rowconfigure(0, weight=1)
-root.columnconfigure(0, weight=1)
-
-# Scrollable Canvas Frame setup
-canvas = tk.Canvas(root)
-canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-scrollbar = tk.Scrollbar(root, command=canvas.yview)
-scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-canvas.configure(yscrollcommand=scrollbar.set)
-
-frame = tk.Frame(canvas)
-canvas.create_window((0, 0), window=frame, anchor="nw")
-
-def on_frame_configure(event):
-    canvas.configure(scrollregion=canvas.bbox("all"))
-
-frame.bind("<Configure>", on_frame_configure)
-
-# Load CSV Button
-button = tk.Button(root, text="Load CSV", command=load_csv)
-button.pack()
-
-root.mainloop()
+        open_log(file_path)
+
+def open_log(path):
+    """Read a log (CSV or run store) in the background, replacing the plots once it is done."""
+    try:
+        log = open_runs(path)
+    except (OSError, ValueError) as error:
+        status_var.set(f"Could not read {path}: {error}")
+        return
+    start_load(log)
+
+def follow():
+    """With "Follow" ticked, parse only the runs appended since the last check."""
+    if follow_var.get() and run_log is not None and loading is None:
+        start_load(run_log)
+    frame.after(FOLLOW_MS, follow)
+
+def cancel_load():
+    if loading is not None:
+        loading.cancel()
+
+def start_load(log):
+    global loading
+    if loading is not None:
+        if loading.log is log:
+            return  # already reading it
+        loading.cancel()  # a new file replaces the one still loading
+    loading = BackgroundLoad(log)
+    frame.after(POLL_MS, poll_load, loading)
+
+def poll_load(load):
+    """Show the progress of ``load``, and its plots once it is finished."""
+    global loading, run_log
+    if load is not loading:
+        return  # replaced by another file
+    offset, size = load.progress
+    progress_bar["value"] = 100 * offset / size if size else 0
+    if not load.done:
+        if load.log is not run_log:  # following is quiet, a new file shows progress
+            status_var.set(f"Loading {load.log.path}: {offset / 1e6:,.0f} / {size / 1e6:,.0f} MB")
+        frame.after(POLL_MS, poll_load, load)
+        return
+    loading = None
+    if load.error is not None:
+        status_var.set(f"Could not read {load.log.path}: {load.error}")
+    elif load.cancelled and load.log is not run_log:
+        status_var.set("Cancelled")
+    elif load.rows or load.log is not run_log:
+        new = f", {load.rows:,} new" if load.log is run_log else ""
+        run_log = load.log
+        create_plots(run_log.stats)
+        frame.update_idletasks()  # draw now, so the time below includes it
+        status_var.set(f"{run_log.stats.rows:,} runs from {run_log.path}{new}, on screen after "
+                       f"{1000 * (time.perf_counter() - load.started):,.0f} ms")
+    progress_bar["value"] = 0
+
+def create_plots(stats, master=None):
+    """Show ``stats``; the figures are embedded once and then only redrawn."""
+    global plots
+    master = master if master is not None else frame
+    if plots is None:
+        plots = Plots()
+        for fig, (row, column) in plots.figures:
+            canvas = FigureCanvasTkAgg(fig, master=master)
+            canvas.get_tk_widget().grid(row=row, column=column, padx=5, pady=5)
+            plt.close(fig)  # the Tk canvas keeps the figure, pyplot does not need to
+    plots.update(stats)
+    for fig, _ in plots.figures:
+        fig.canvas.draw_idle()
+
+
+class Plots:
+    """The analysis figures with their (row, column) in the window.
+
+    The figures are made once; ``update`` puts new data into the existing
+    artists (histogram bars, scatter points, table cells; the pie and the
+    strip plot are redrawn in their axes), the canvases are then redrawn.
+    Needs no Tk window, so the plots can also be drawn (or timed)
+    off-screen.
+
+    With more than ``density_rows`` runs, the scatter and strip plots stop
+    drawing a marker per run: the runs are counted on a grid and drawn as a
+    heatmap (darker is more runs, log scale), so drawing takes about as
+    long for a billion runs as for twenty thousand.
+    """
+    def __init__(self, fig_size=(4, 3), density_rows=DENSITY_ROWS):
+        self.density_rows = density_rows
+        self.figures = []
+
+        # Pie Chart
+        fig1, self.ax1 = plt.subplots(figsize=fig_size)
+        self.figures.append((fig1, (0, 0)))
+
+        # Score Histogram
+        fig2, ax2 = plt.subplots(figsize=fig_size)
+        _, _, self.bars = ax2.hist([], bins=10, color='skyblue')
+        ax2.set_title("Score Distribution")
+        ax2.set_xlabel("Score")
+        ax2.set_ylabel("Frequency")
+        self.ax2 = ax2
+        self.figures.append((fig2, (0, 1)))
+
+        # Scatter: Total Moves vs Time
+        fig3, ax3 = plt.subplots(figsize=fig_size)
+        self.points = ax3.scatter([], [], color='green')
+        self.mesh = None  # density grid drawn instead of the points
+        ax3.set_title("Total Moves vs Time")
+        ax3.set_xlabel("Total Moves")
+        ax3.set_ylabel("Time (s)")
+        self.ax3 = ax3
+        self.figures.append((fig3, (0, 2)))
+
+        # Power-ups Collected vs Game Result
+        fig4, self.ax4 = plt.subplots(figsize=fig_size)
+        self.figures.append((fig4, (1, 0)))
+
+        # Score Statistics Table (with larger font)
+        fig5, ax5 = plt.subplots(figsize=(fig_size[0], 2))
+        ax5.axis('tight')
+        ax5.axis('off')
+        self.table = ax5.table(cellText=[[""] * len(SCORE_STATS)], colLabels=SCORE_STATS,
+                               loc='center', cellLoc='center')
+        self.table.auto_set_font_size(False)
+        self.table.set_fontsize(8)
+        self.table.scale(1.2, 1.5)
+        self.figures.append((fig5, (1, 1)))
+
+    def update(self, stats):
+        ax1 = self.ax1
+        ax1.clear()
+        result_counts = pd.Series(stats.results, dtype=np.int64).sort_values(ascending=False)
+        if len(result_counts):
+            ax1.pie(result_counts, labels=result_counts.index, autopct='%1.1f%%')
+        ax1.set_title("Game Results")
+
+        counts, edges = stats.score_histogram(bins=10)
+        for bar, count, left, right in zip(self.bars, counts, edges, edges[1:]):
+            bar.set_x(left)
+            bar.set_width(right - left)
+            bar.set_height(count)
+        self.ax2.relim()
+        self.ax2.autoscale_view()
+
+        # Runs with the same moves and time are one marker (or grid cell)
+        moves_time = np.array(list(stats.moves_time), dtype=np.int64).reshape(-1, 2)
+        if self.mesh is not None:
+            self.mesh.remove()
+            self.mesh = None
+        if stats.rows > self.density_rows:
+            runs = np.fromiter(stats.moves_time.values(), np.int64, len(stats.moves_time))
+            grid, x_edges, y_edges = np.histogram2d(moves_time[:, 0], moves_time[:, 1],
+                                                    bins=DENSITY_BINS, weights=runs)
+            self.mesh = self.ax3.pcolormesh(x_edges, y_edges, grid.T, cmap='Greens', norm=LogNorm())
+            self.points.set_offsets(np.empty((0, 2)))
+        else:
+            self.points.set_offsets(moves_time)
+        self.ax3.ignore_existing_data_limits = True
+        self.ax3.update_datalim(moves_time)
+        self.ax3.autoscale_view()
+
+        ax4 = self.ax4
+        ax4.clear()
+        powerups = pd.Series(stats.powerups, dtype=np.int64)
+        if len(powerups) and stats.rows > self.density_rows:
+            self.density_strip(stats)
+        elif len(powerups):
+            points = pd.DataFrame({
+                'game_result': np.repeat(powerups.index.get_level_values(0), powerups.values),
+                'power-up_collected': np.repeat(powerups.index.get_level_values(1), powerups.values),
+            })
+            sns.stripplot(x='game_result', y='power-up_collected', data=points, ax=ax4, jitter=True,
+                          palette='Set2', order=list(stats.results))
+        ax4.set_title("Power-ups Collected by Game Result")
+        ax4.set_xlabel("Game Result")
+        ax4.set_ylabel("Power-ups Collected")
+
+        score_stats = stats.describe().round(2)
+        for column, name in enumerate(SCORE_STATS):
+            value = score_stats.get(name)
+            self.table[1, column].get_text().set_text("" if value is None else str(value))
+
+    def density_strip(self, stats):
+        """Power-ups by result as one column of cells per result, shaded by runs."""
+        ax4 = self.ax4
+        results = list(stats.results)
+        collected = [powerups for _, powerups in stats.powerups]
+        low, high = min(collected), max(collected)
+        grid = np.zeros((high - low + 1, len(results)))
+        for (result, powerups), runs in stats.powerups.items():
+            grid[powerups - low, results.index(result)] = runs
+        norm = LogNorm(vmin=1, vmax=grid.max())
+        y_edges = np.arange(low, high + 2) - 0.5
+        for column in range(len(results)):
+            ax4.pcolormesh([column - 0.4, column + 0.4], y_edges, grid[:, column:column + 1],
+                           cmap='Blues', norm=norm)
+        ax4.set_xticks(range(len(results)), results)
+        ax4.set_xlim(-0.5, len(results) - 0.5)
+
+
+def build_figures(stats, fig_size=(4, 3)):
+    """The analysis figures of a RunStats with their (row, column) in the window."""
+    plots = Plots(fig_size)
+    plots.update(stats)
+    return plots.figures
+
+
+def main(path=None, follow_log=False):
+    global frame, follow_var, status_var, progress_bar
+    # Main Window
+    root = tk.Tk()
+    root.title("Game Data Analysis")
+
+    # Make window resizable
+    root.geometry("1200x800")
+    root.rowconfigure(0, weight=1)
+    root.columnconfigure(0, weight=1)
+
+    # Scrollable Canvas Frame setup
+    canvas = tk.Canvas(root)
+    canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+    scrollbar = tk.Scrollbar(root, command=canvas.yview)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    canvas.configure(yscrollcommand=scrollbar.set)
+
+    frame = tk.Frame(canvas)
+    canvas.create_window((0, 0), window=frame, anchor="nw")
+
+    def on_frame_configure(event):
+        canvas.configure(scrollregion=canvas.bbox("all"))
+
+    frame.bind("<Configure>", on_frame_configure)
+
+    # Load CSV Button
+    button = tk.Button(root, text="Load CSV", command=load_csv)
+    button.pack()
+
+    # Follow a log that is still being written (the game or balance.py)
+    follow_var = tk.BooleanVar(value=follow_log)
+    tk.Checkbutton(root, text="Follow", variable=follow_var).pack()
+    frame.after(FOLLOW_MS, follow)
+
+    # Loading runs in the background: progress, cancel and how long it took
+    progress_bar = ttk.Progressbar(root, length=150, maximum=100)
+    progress_bar.pack()
+    tk.Button(root, text="Cancel", command=cancel_load).pack()
+    status_var = tk.StringVar()
+    tk.Label(root, textvariable=status_var, wraplength=150).pack()
+
+    if path:
+        open_log(path)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    # python data_visualize.py [FILE] [--follow]
+    paths = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    main(paths[0] if paths else None, "--follow" in sys.argv)
@@ -0,0 +1,247 @@
+"""Gym-style environments for training agents on Slay the Dragon.
+
+``DragonEnv`` wraps one Simulation with the usual ``reset()`` / ``step(action)``
+API (gymnasium's five-tuple step). ``VectorEnv`` runs many of them in worker
+processes. Observations, actions, rewards and done flags live in shared
+memory, so a step only sends one byte to each worker and back; the arrays
+returned are views that the next step overwrites.
+
+Observations are a dict of
+
+* ``board``: uint8 array (5, size, size), one channel each for the knight,
+  the dragon, straight fireballs, random fireballs and the power-up,
+* ``scalars``: float32 array (3,), the dragon's HP and the invincibility
+  left (both as a fraction of their start value) and the elapsed fraction
+  of ``max_ticks``.
+
+Actions are 0 stay, 1 up, 2 down, 3 left, 4 right (as in batch_engine).
+
+Run ``python env.py`` for the env-steps per second of both.
+"""
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from simulation import Simulation, SimConfig
+
+ACTIONS = [(0, 0), (0, -1), (0, 1), (-1, 0), (1, 0)]
+CHANNELS = ("player", "dragon", "fireballs", "random_fireballs", "powerup")
+N_SCALARS = 3
+MAX_TICKS = 6000
+
+# Reward per event of Simulation.step
+REWARDS = {
+    "dragon_hit": 1.0,
+    "win": 10.0,
+    "player_hit": -10.0,
+    "player_hit_random": -10.0,
+}
+
+
+def write_observation(sim, board, scalars, max_ticks=MAX_TICKS):
+    """Fill preallocated ``board`` and ``scalars`` arrays with the state of ``sim``."""
+    board.fill(0)
+    x, y = sim.player.position
+    board[0, y, x] = 1
+    x, y = sim.dragon.position
+    board[1, y, x] = 1
+    for x, y in sim.fireballs.positions():
+        board[2, y, x] = 1
+    store = sim.fireball_randoms
+    if store.count:
+        board[3, store.y[:store.count], store.x[:store.count]] = 1
+    if sim.powerup:
+        x, y = sim.powerup.position
+        board[4, y, x] = 1
+    cfg = sim.config
+    scalars[0] = sim.dragon.hp / cfg.dragon_hp
+    scalars[1] = (max(0, sim.invincible_tick + cfg.invincible_ticks - sim.tick) / cfg.invincible_ticks
+                  if sim.invincible else 0.0)
+    scalars[2] = sim.tick / max_ticks
+
+
+class DragonEnv:
+    """One game. A run is truncated after ``max_ticks`` ticks.
+
+    ``board`` and ``scalars`` may be given to write observations straight
+    into existing (e.g. shared) arrays.
+    """
+    def __init__(self, config=None, seed=None, max_ticks=MAX_TICKS, board=None, scalars=None):
+        self.config = config or SimConfig()
+        self.max_ticks = max_ticks
+        self.sim = Simulation(seed, config=self.config)
+        size = self.config.board_size
+        self.board = board if board is not None else np.zeros((len(CHANNELS), size, size), np.uint8)
+        self.scalars = scalars if scalars is not None else np.zeros(N_SCALARS, np.float32)
+
+    def observation(self):
+        write_observation(self.sim, self.board, self.scalars, self.max_ticks)
+        return {"board": self.board, "scalars": self.scalars}
+
+    def reset(self, seed=None):
+        """Start a new run; without ``seed`` it is drawn from the previous run's rng."""
+        self.sim.reset(seed=seed if seed is not None else self.sim.rng.getrandbits(64))
+        return self.observation(), {}
+
+    def step(self, action):
+        sim = self.sim
+        events = sim.step(*ACTIONS[action])
+        reward = 0.0
+        for event in events:
+            reward += REWARDS.get(event, 0.0)
+        truncated = not sim.game_over and sim.tick >= self.max_ticks
+        info = {"events": events}
+        if sim.game_over or truncated:
+            info["result"] = sim.result()
+        return self.observation(), reward, sim.game_over, truncated, info
+
+
+def _shared_array(shape, dtype):
+    """A NumPy array in a new shared memory block."""
+    size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+    block = shared_memory.SharedMemory(create=True, size=size)
+    return block, np.ndarray(shape, dtype, buffer=block.buf)
+
+
+def _worker(connection, names, shapes, first, count, config, seed, max_ticks):
+    blocks = {key: shared_memory.SharedMemory(name=name) for key, name in names.items()}
+    try:
+        _serve(connection, blocks, shapes, first, count, config, seed, max_ticks)
+    finally:
+        for block in blocks.values():
+            block.close()
+
+
+def _serve(connection, blocks, shapes, first, count, config, seed, max_ticks):
+    arrays = {key: np.ndarray(*shapes[key], buffer=block.buf) for key, block in blocks.items()}
+    envs = [DragonEnv(config, seed + i, max_ticks, arrays["board"][i], arrays["scalars"][i])
+            for i in range(first, first + count)]
+    actions, rewards = arrays["actions"], arrays["rewards"]
+    terminated, truncated = arrays["terminated"], arrays["truncated"]
+    while True:
+        command = connection.recv_bytes()
+        if command == b"s":
+            for i, env in enumerate(envs, first):
+                _, reward, done, cut, _ = env.step(actions[i])
+                rewards[i] = reward
+                terminated[i] = done
+                truncated[i] = cut
+                if done or cut:
+                    env.reset()  # the next observation is the new run's first
+        elif command == b"r":
+            for env in envs:
+                env.reset()
+        else:
+            return
+        connection.send_bytes(b"d")
+
+
+class VectorEnv:
+    """``n_envs`` games split over ``n_workers`` processes (default: one per core).
+
+    ``step(actions)`` takes one action per game and returns
+    ``(observations, rewards, terminated, truncated)``. Finished games are
+    reset at once, so their observation is already the next run's first.
+    All returned arrays are views into shared memory and are overwritten by
+    the next call; copy what you want to keep. Call ``close`` when done.
+    """
+    def __init__(self, n_envs, n_workers=None, config=None, seed=0, max_ticks=MAX_TICKS):
+        self.n_envs = n_envs
+        self.config = config or SimConfig()
+        n_workers = min(n_workers or os.cpu_count(), n_envs)
+        size = self.config.board_size
+        shapes = {
+            "board": ((n_envs, len(CHANNELS), size, size), np.uint8),
+            "scalars": ((n_envs, N_SCALARS), np.float32),
+            "actions": ((n_envs,), np.int8),
+            "rewards": ((n_envs,), np.float32),
+            "terminated": ((n_envs,), np.bool_),
+            "truncated": ((n_envs,), np.bool_),
+        }
+        self.blocks = {}
+        for key, (shape, dtype) in shapes.items():
+            block, array = _shared_array(shape, dtype)
+            self.blocks[key] = block
+            setattr(self, key, array)
+        names = {key: block.name for key, block in self.blocks.items()}
+
+        self.connections = []
+        self.workers = []
+        per_worker = -(-n_envs // n_workers)
+        for first in range(0, n_envs, per_worker):
+            parent, child = multiprocessing.Pipe()
+            worker = multiprocessing.Process(
+                target=_worker, daemon=True,
+                args=(child, names, shapes, first, min(per_worker, n_envs - first),
+                      self.config, seed, max_ticks))
+            worker.start()
+            self.connections.append(parent)
+            self.workers.append(worker)
+
+    def _call(self, command):
+        for connection in self.connections:
+            connection.send_bytes(command)
+        for connection in self.connections:
+            connection.recv_bytes()
+
+    def reset(self):
+        """Start a new run in every game; returns the first observations."""
+        self._call(b"r")
+        return {"board": self.board, "scalars": self.scalars}
+
+    def step(self, actions):
+        self.actions[:] = actions
+        self._call(b"s")
+        return ({"board": self.board, "scalars": self.scalars},
+                self.rewards, self.terminated, self.truncated)
+
+    def close(self):
+        for connection in self.connections:
+            connection.send_bytes(b"q")
+        for worker in self.workers:
+            worker.join()
+        for key, block in self.blocks.items():
+            delattr(self, key)
+            block.unlink()
+            try:
+                block.close()
+            except BufferError:
+                pass  # the caller still holds a view; the memory goes with it
+        self.blocks = {}
+
+
+def steps_per_second(n_envs=64, n_workers=None, steps=500, seed=0):
+    """Env-steps per second of VectorEnv with random actions (0 workers: one DragonEnv)."""
+    rng = np.random.default_rng(seed)
+    if n_workers == 0:
+        env = DragonEnv(seed=seed)
+        env.reset()
+        actions = rng.integers(0, len(ACTIONS), steps * n_envs)
+        start = time.perf_counter()
+        for action in actions:
+            _, _, done, cut, _ = env.step(action)
+            if done or cut:
+                env.reset()
+        return len(actions) / (time.perf_counter() - start)
+    env = VectorEnv(n_envs, n_workers, seed=seed)
+    try:
+        env.reset()
+        actions = rng.integers(0, len(ACTIONS), (steps, n_envs))
+        start = time.perf_counter()
+        for step_actions in actions:
+            env.step(step_actions)
+        return steps * n_envs / (time.perf_counter() - start)
+    finally:
+        env.close()
+
+
+if __name__ == "__main__":
+    cores = os.cpu_count()
+    single = steps_per_second(n_workers=0)
+    print(f"DragonEnv, one process:         {single:,.0f} env-steps/s")
+    vector = steps_per_second(n_workers=cores)
+    print(f"VectorEnv, 64 envs, {cores} workers: {vector:,.0f} env-steps/s "
+          f"({vector / cores:,.0f} per core)")
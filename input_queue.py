@@ -0,0 +1,65 @@
+import time
+from collections import deque
+
+from timestep import percentile
+
+
+class InputQueue:
+    """Bounded queue of moves, each stamped with the time its key was pressed.
+
+    The game consumes one move per simulation tick, so quick presses between
+    two ticks are played one after the other instead of being merged or lost.
+    When the queue is full new presses are dropped (and counted) rather than
+    piling up lag. In ``immediate`` mode the game applies each move as soon
+    as it is read and the queue is only used for latency bookkeeping.
+
+    Input-to-display latency is measured from the moment the press is read
+    from the event queue (at most one render frame after the key went down)
+    to the flip of the first frame showing the move.
+    """
+    def __init__(self, maxlen=4, immediate=False, clock=time.perf_counter, history=600):
+        self.maxlen = maxlen
+        self.immediate = immediate
+        self.clock = clock
+        self.moves = deque()
+        self.on_screen_next = []  # press times of moves applied since the last frame
+        self.latencies = deque(maxlen=history)
+        self.dropped = 0
+
+    def push(self, dx, dy, timestamp=None):
+        if len(self.moves) >= self.maxlen:
+            self.dropped += 1
+            return False
+        self.moves.append((dx, dy, self.clock() if timestamp is None else timestamp))
+        return True
+
+    def pop(self):
+        """Next move as (dx, dy, pressed_at), or None."""
+        return self.moves.popleft() if self.moves else None
+
+    def applied(self, pressed_at):
+        self.on_screen_next.append(pressed_at)
+
+    def frame_displayed(self):
+        if self.on_screen_next:
+            now = self.clock()
+            self.latencies.extend(now - pressed_at for pressed_at in self.on_screen_next)
+            self.on_screen_next.clear()
+
+    def clear(self):
+        self.moves.clear()
+        self.on_screen_next.clear()
+
+    def latency(self):
+        """Input-to-display latency percentiles in milliseconds."""
+        values = [latency * 1000 for latency in self.latencies]
+        return {
+            "samples": len(values),
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+            "p99_ms": percentile(values, 99),
+            "dropped": self.dropped,
+        }
+
+    def __len__(self):
+        return len(self.moves)
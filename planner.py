@@ -0,0 +1,244 @@
+"""Time-expanded danger map and a planning bot that plays by it.
+
+The board is a bitset (one Python int, bit ``y * size + x`` per cell) and the
+danger map keeps one bitset per upcoming tick: ``layer(k)`` holds the cells
+that are lethal during tick ``sim.tick + k``. It contains
+
+* straight fireballs already in flight, from their closed-form trajectory,
+* random fireballs on the board, for the rest of their lifetime,
+* the shots the dragon will fire from where it stands in the straight
+  fireball phase (HP 5-7), every ``fireball_cooldown`` ticks.
+
+Random fireballs the dragon has not spawned yet cannot be known.
+
+The map is a ring of ``horizon`` layers updated incrementally: when the game
+advances one tick the expired layer is reused for the new last tick and
+painted with the fireballs still burning then (on boards wider than the
+horizon a straight fireball outlives it), and fireballs spawned since the
+previous update are added to every layer. The predicted shots are
+recomputed only when the dragon is hit (it teleports and loses HP).
+
+Planning is a breadth-first search over (cell, tick) done a whole layer at
+a time: the cells reachable on tick k + 1 are the cells reachable on tick k
+grown by one step in each direction, minus the lethal cells of tick k + 1.
+On the 25x25 board a decision takes a few tens of microseconds.
+"""
+from simulation import SHOT_DIRECTIONS
+from trajectory import edge_steps
+
+HORIZON = 64  # ticks looked ahead; the 25x25 board is 48 moves across
+
+
+class DangerMap:
+    def __init__(self, horizon=HORIZON):
+        self.horizon = horizon
+        self.sim = None
+
+    def rebuild(self, sim):
+        """Build the map for ``sim`` from scratch."""
+        self.sim = sim
+        self.size = size = sim.config.board_size
+        self.tick = sim.tick
+        self.known = [0] * self.horizon  # fireballs on the board
+        self.predicted = [0] * self.horizon  # shots the dragon has not fired yet
+        self.last_fireball = -1  # highest straight fireball id added
+        self.random_seen = sim.random_spawned
+        store = sim.fireball_randoms
+        self.add_randoms(range(store.count))
+        self.add_straight()
+        self.predict_shots()
+        # Masks for growing a bitset by one step without wrapping around rows
+        self.full = (1 << size * size) - 1
+        left_edge = right_edge = 0
+        for y in range(size):
+            left_edge |= 1 << y * size
+            right_edge |= 1 << y * size + size - 1
+        self.not_left = self.full & ~left_edge
+        self.not_right = self.full & ~right_edge
+
+    def update(self, sim):
+        """Bring the map up to ``sim.tick``, incrementally when possible."""
+        passed = sim.tick - self.tick if sim is self.sim else -1
+        # Random fireballs live at least 10 ticks, so within that gap the new
+        # ones are exactly the last entries of the store
+        if passed < 0 or passed >= min(self.horizon, 10):
+            self.rebuild(sim)
+            return
+        horizon = self.horizon
+        for tick in range(self.tick, sim.tick):
+            slot = tick % horizon
+            self.known[slot] = 0
+            self.predicted[slot] = 0
+        self.tick = sim.tick
+        # The layers that just entered the ring get the fireballs already known
+        last = sim.tick + horizon
+        self.paint_randoms(range(sim.fireball_randoms.count - (sim.random_spawned - self.random_seen)),
+                           last - passed, last)
+        self.paint_straight(sim.fireballs.fireballs.values(), last - passed, last)
+
+        dragon = sim.dragon
+        if (dragon.position, dragon.hp) != self.dragon_state:
+            self.predict_shots()
+        elif self.shot_start is not None:
+            for tick in range(sim.tick + horizon - passed, sim.tick + horizon):
+                self.predicted[tick % horizon] = self.predicted_cells(tick)
+
+        new = sim.random_spawned - self.random_seen
+        if new:
+            store = sim.fireball_randoms
+            self.add_randoms(range(store.count - new, store.count))
+            self.random_seen = sim.random_spawned
+        self.add_straight()
+
+    def layer(self, k):
+        """Bitset of the cells lethal during tick ``tick + k``."""
+        slot = (self.tick + k) % self.horizon
+        return self.known[slot] | self.predicted[slot]
+
+    def add_randoms(self, indexes):
+        self.paint_randoms(indexes, self.tick, self.tick + self.horizon)
+
+    def paint_randoms(self, indexes, first, last):
+        """A random fireball with ``life`` left burns for the next ``life`` ticks;
+        draw it into the layers of ticks ``first``..``last - 1``."""
+        store = self.sim.fireball_randoms
+        size, horizon, known, tick = self.size, self.horizon, self.known, self.tick
+        for i in indexes:
+            bit = 1 << store.y[i] * size + store.x[i]
+            for t in range(first, min(tick + store.life[i], last)):
+                known[t % horizon] |= bit
+
+    def add_straight(self):
+        fireballs = self.sim.fireballs.fireballs
+        new = []
+        for fireball_id in reversed(fireballs):  # ids grow, newest last
+            if fireball_id <= self.last_fireball:
+                break
+            new.append(fireballs[fireball_id])
+        if new:
+            self.last_fireball = next(reversed(fireballs))
+        self.paint_straight(new, self.tick, self.tick + self.horizon)
+
+    def paint_straight(self, fireballs, first, last):
+        """Draw straight fireballs into the layers of ticks ``first``..``last - 1``."""
+        size, horizon, known = self.size, self.horizon, self.known
+        for x, y, dx, dy, spawn, steps in fireballs:
+            for t in range(max(spawn, first), min(spawn + steps + 1, last)):
+                moved = min(t - spawn + 1, steps)
+                known[t % horizon] |= 1 << (y + dy * moved) * size + x + dx * moved
+
+    def predict_shots(self):
+        """Shots of a dragon in the straight fireball phase, if it is not hit again."""
+        sim, dragon = self.sim, self.sim.dragon
+        self.dragon_state = (dragon.position, dragon.hp)
+        self.shot_start = None
+        if 5 <= dragon.hp < 8:
+            # Cooldown is counted down before the dragon tries to shoot
+            self.shot_start = sim.tick + max(dragon.fireball_cooldown - 1, 0)
+            self.shot_period = max(dragon.cooldown_ticks, 1)
+            x, y = dragon.position
+            self.shot_steps = [(dx, dy, edge_steps(self.size, x, y, dx, dy))
+                               for dx, dy in SHOT_DIRECTIONS]
+        for k in range(self.horizon):
+            tick = self.tick + k
+            self.predicted[tick % self.horizon] = (self.predicted_cells(tick)
+                                                   if self.shot_start is not None else 0)
+
+    def predicted_cells(self, tick):
+        start, period = self.shot_start, self.shot_period
+        if tick < start:
+            return 0
+        size = self.size
+        x, y = self.dragon_state[0]
+        cells = 0
+        last_shot = start + (tick - start) // period * period
+        for dx, dy, steps in self.shot_steps:
+            shot = last_shot
+            while shot >= start and tick <= shot + steps:
+                moved = min(tick - shot + 1, steps)
+                cells |= 1 << (y + dy * moved) * size + x + dx * moved
+                shot -= period
+        return cells
+
+
+class Planner:
+    """Bot policy (see bots.py) that walks the fastest path that avoids every
+    known fireball to the dragon, or to a power-up first while the dragon is
+    fighting back.
+
+    When no target can be reached it keeps to cells that stay safe the
+    longest, as close to the target as possible. The danger map follows the
+    game it was last called with and is rebuilt when called with another
+    game (or after a reset).
+    """
+    def __init__(self, horizon=HORIZON):
+        self.danger = DangerMap(horizon)
+
+    def __call__(self, sim, rng=None):
+        danger = self.danger
+        danger.update(sim)
+        size = sim.config.board_size
+        px, py = sim.player.position
+        start = py * size + px
+        dragon = sim.dragon
+        targets = [(1 << dragon.position[1] * size + dragon.position[0], dragon.position)]
+        if sim.powerup and not sim.invincible and dragon.hp < 8:
+            x, y = sim.powerup.position
+            targets.insert(0, (1 << y * size + x, (x, y)))
+        target_bits = 0
+        for bit, _ in targets:
+            target_bits |= bit
+
+        # Invincibility covers every tick up to invincible_tick + invincible_ticks
+        safe_until = (sim.invincible_tick + sim.config.invincible_ticks - sim.tick
+                      if sim.invincible else -1)
+        full, not_left, not_right = danger.full, danger.not_left, danger.not_right
+
+        reach = []
+        cells = 1 << start
+        for k in range(danger.horizon):
+            grown = (cells | (cells << 1 & not_left) | (cells >> 1 & not_right)
+                     | cells << size | cells >> size) & full
+            if k > safe_until:
+                grown &= ~danger.layer(k)
+            if not grown:
+                break
+            reach.append(grown)
+            cells = grown
+            if grown & target_bits:
+                for bit, _ in targets:
+                    if grown & bit:
+                        return self.first_move(reach, bit.bit_length() - 1, start, size)
+
+        if not reach:
+            # Nowhere is safe next tick; head for the dragon anyway
+            tx, ty = dragon.position
+            if px != tx:
+                return (1 if tx > px else -1), 0
+            return 0, (1 if ty > py else -1 if ty < py else 0)
+
+        # Survive as long as possible, as close to the target as possible
+        tx, ty = targets[0][1]
+        last = reach[-1]
+        best, best_distance = None, None
+        while last:
+            bit = last & -last
+            cell = bit.bit_length() - 1
+            distance = abs(cell % size - tx) + abs(cell // size - ty)
+            if best is None or distance < best_distance:
+                best, best_distance = cell, distance
+            last ^= bit
+        return self.first_move(reach, best, start, size)
+
+    @staticmethod
+    def first_move(reach, cell, start, size):
+        """Walk back from ``cell`` on the last layer of ``reach`` to the first move."""
+        for k in range(len(reach) - 1, 0, -1):
+            previous = reach[k - 1]
+            x = cell % size
+            for candidate in (cell, cell - 1 if x > 0 else -1, cell + 1 if x < size - 1 else -1,
+                              cell - size, cell + size):
+                if candidate >= 0 and previous >> candidate & 1:
+                    cell = candidate
+                    break
+        return cell % size - start % size, cell // size - start // size
@@ -0,0 +1,75 @@
+import json
+import logging
+import time
+from collections import deque
+
+from timestep import percentile
+
+# Game log ("Dragon takes damage!" and friends). Silent unless the level is
+# lowered, e.g. with the --verbose flag of the game.
+log = logging.getLogger("slaythedragon")
+
+
+class FrameProfiler:
+    """Times the phases of a frame and keeps rolling statistics.
+
+    Usage around any piece of code::
+
+        start = profiler.clock()
+        ...
+        profiler.record("draw_game", start)
+
+    Every phase keeps its last ``history`` durations for the p50/p95/p99
+    numbers. With ``trace`` on, phases and counters are also kept as Chrome
+    trace events (up to ``max_trace_events``) for ``export_chrome_trace``;
+    open the file in chrome://tracing or https://ui.perfetto.dev.
+    """
+    def __init__(self, history=300, trace=False, max_trace_events=200000,
+                 clock=time.perf_counter):
+        self.clock = clock
+        self.history = history
+        self.trace = trace
+        self.max_trace_events = max_trace_events
+        self.origin = clock()
+        self.durations = {}  # phase -> deque of seconds
+        self.counters = {}  # name -> last value
+        self.trace_events = []
+
+    def record(self, phase, start):
+        end = self.clock()
+        durations = self.durations.get(phase)
+        if durations is None:
+            durations = self.durations[phase] = deque(maxlen=self.history)
+        durations.append(end - start)
+        if self.trace and len(self.trace_events) < self.max_trace_events:
+            self.trace_events.append({
+                "name": phase, "ph": "X", "pid": 0, "tid": 0,
+                "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6,
+            })
+
+    def count(self, name, value):
+        """Record a live value (e.g. number of fireballs) for the HUD and trace."""
+        self.counters[name] = value
+        if self.trace and len(self.trace_events) < self.max_trace_events:
+            self.trace_events.append({
+                "name": name, "ph": "C", "pid": 0, "tid": 0,
+                "ts": (self.clock() - self.origin) * 1e6, "args": {name: value},
+            })
+
+    def stats(self):
+        """Rolling p50/p95/p99 and mean of every phase, in milliseconds."""
+        stats = {}
+        for phase, durations in self.durations.items():
+            values = [duration * 1000 for duration in durations]
+            stats[phase] = {
+                "p50_ms": percentile(values, 50),
+                "p95_ms": percentile(values, 95),
+                "p99_ms": percentile(values, 99),
+                "mean_ms": sum(values) / len(values),
+            }
+        return stats
+
+    def export_chrome_trace(self, path):
+        with open(path, "w") as file:
+            json.dump({"traceEvents": self.trace_events, "displayTimeUnit": "ms"}, file)
+        return len(self.trace_events)
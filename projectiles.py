@@ -0,0 +1,47 @@
+class ProjectileStore:
+    """Pool of fireballs kept as parallel arrays instead of one object each.
+
+    Fireball ``i`` sits still at ``(x[i], y[i])`` with ``life[i]`` ticks
+    left. Only the first ``count`` slots are in use; the update loops in
+    Simulation compact survivors to the front in place, so freed slots are
+    reused by the next spawn and the arrays only ever grow.
+
+    The columns are plain preallocated lists: indexing them is much faster
+    than ``array.array`` in CPython, and coordinates and lifetimes are small
+    ints that Python caches, so updating a slot allocates nothing.
+    """
+    __slots__ = ("x", "y", "life", "count", "capacity")
+
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.capacity = 0
+        self.x = []
+        self.y = []
+        self.life = []
+        self.reserve(capacity)
+
+    def reserve(self, capacity):
+        """Make room for at least ``capacity`` fireballs."""
+        if capacity <= self.capacity:
+            return
+        capacity = max(capacity, 2 * self.capacity)
+        extra = [0] * (capacity - self.capacity)
+        for column in (self.x, self.y, self.life):
+            column.extend(extra)
+        self.capacity = capacity
+
+    def add(self, x, y, life=0):
+        i = self.count
+        if i == self.capacity:
+            self.reserve(i + 1)
+        self.x[i] = x
+        self.y[i] = y
+        self.life[i] = life
+        self.count = i + 1
+
+    def positions(self):
+        x, y = self.x, self.y
+        return [(x[i], y[i]) for i in range(self.count)]
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,212 @@
+"""Record games to a compact binary file and replay them headlessly.
+
+A replay is the seed, the SimConfig and the moves of one run, plus a
+CRC32 of the game state every ``interval`` ticks and at the end. Replaying
+feeds the moves back into a fresh Simulation as fast as it will go and
+checks every checksum, so a replay reproduces a bug report exactly and
+doubles as a benchmark::
+
+    python replay.py last_replay.sdr
+"""
+import struct
+import sys
+import time
+import zlib
+from array import array
+from dataclasses import astuple, fields
+
+from simulation import Simulation, SimConfig, FPS, SHOT_DIRECTIONS
+
+MAGIC = b"SDRP"
+VERSION = 1
+CHECKPOINT_INTERVAL = 10  # ticks between checksums, one second of game time
+
+# File layout (little endian):
+#   header   magic, version, seed, number of config fields
+#   config   one int32 per SimConfig field
+#   run      ticks, checksum interval, number of moves, number of checksums
+#   moves    one varint per move: ticks since the previous move * 4 + direction
+#   checks   one uint32 per checkpoint, then the final checksum
+HEADER = struct.Struct("<4sBQB")
+RUN = struct.Struct("<IHII")
+MOVE_CODES = {direction: code for code, direction in enumerate(SHOT_DIRECTIONS)}
+
+
+class ReplayMismatch(Exception):
+    """The replayed game diverged from the recording."""
+
+
+def state_checksum(sim):
+    """CRC32 of everything that decides what happens next in ``sim``."""
+    powerup = sim.powerup.position if sim.powerup else (-1, -1)
+    values = array("i", (
+        sim.tick, *sim.player.position, *sim.dragon.position, sim.dragon.hp,
+        sim.dragon.fireball_cooldown, sim.score, sim.move_count,
+        sim.powerups_collected, sim.invincible, sim.invincible_tick,
+        sim.game_over, sim.win, *powerup, sim.powerup_spawn_tick,
+    ))
+    for x, y in sim.fireballs.positions():
+        values.append(x)
+        values.append(y)
+    store = sim.fireball_randoms
+    values.extend(store.x[:store.count])
+    values.extend(store.y[:store.count])
+    values.extend(store.life[:store.count])
+    return zlib.crc32(values.tobytes())
+
+
+class Replay:
+    def __init__(self, seed, config, moves=None, ticks=0, interval=CHECKPOINT_INTERVAL,
+                 checksums=None, final_checksum=0):
+        self.seed = seed
+        self.config = config
+        self.moves = moves if moves is not None else []  # (tick, dx, dy)
+        self.ticks = ticks
+        self.interval = interval
+        self.checksums = checksums if checksums is not None else []
+        self.final_checksum = final_checksum
+
+    def to_bytes(self):
+        config = astuple(self.config)
+        data = bytearray(HEADER.pack(MAGIC, VERSION, self.seed, len(config)))
+        data += struct.pack(f"<{len(config)}i", *config)
+        data += RUN.pack(self.ticks, self.interval, len(self.moves), len(self.checksums))
+        last = 0
+        for tick, dx, dy in self.moves:
+            value = (tick - last) * 4 + MOVE_CODES[(dx, dy)]
+            last = tick
+            while value >= 0x80:
+                data.append(value & 0x7F | 0x80)
+                value >>= 7
+            data.append(value)
+        data += array("I", self.checksums + [self.final_checksum]).tobytes()
+        return bytes(data)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, seed, n_config = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a Slay the Dragon replay (or an unsupported version)")
+        offset = HEADER.size
+        values = struct.unpack_from(f"<{n_config}i", data, offset)
+        config = SimConfig(**{field.name: value for field, value in zip(fields(SimConfig), values)})
+        offset += 4 * n_config
+        ticks, interval, n_moves, n_checksums = RUN.unpack_from(data, offset)
+        offset += RUN.size
+
+        moves = []
+        tick = 0
+        for _ in range(n_moves):
+            value = shift = 0
+            while True:
+                byte = data[offset]
+                offset += 1
+                value |= (byte & 0x7F) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            tick += value >> 2
+            moves.append((tick, *SHOT_DIRECTIONS[value & 3]))
+
+        checksums = array("I")
+        checksums.frombytes(data[offset:offset + 4 * (n_checksums + 1)])
+        return cls(seed, config, moves, ticks, interval, checksums[:-1].tolist(), checksums[-1])
+
+    def save(self, path):
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+
+class ReplayRecorder:
+    """Records the runs of a Simulation it is attached to.
+
+    Every ``reset`` starts a new recording; ``replay`` is the current (or,
+    once the game is over, the finished) run. With a ``path`` each finished
+    run is also saved there, overwriting the previous one.
+    """
+    def __init__(self, path=None, interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.replay = None
+
+    def attach(self, sim):
+        sim.recorder = self
+        self.begin(sim)
+        return self
+
+    def begin(self, sim):
+        if not isinstance(sim.seed, int) or not 0 <= sim.seed < 2 ** 64:
+            raise ValueError("only games created from an integer seed can be recorded")
+        self.replay = Replay(sim.seed, sim.config, interval=self.interval)
+
+    def move(self, tick, dx, dy):
+        if (dx, dy) not in MOVE_CODES:
+            raise ValueError(f"cannot record a move by ({dx}, {dy})")
+        self.replay.moves.append((tick, dx, dy))
+
+    def tick_done(self, sim):
+        replay = self.replay
+        replay.ticks = sim.tick
+        if sim.tick % self.interval == 0:
+            replay.checksums.append(state_checksum(sim))
+        if sim.game_over:
+            self.finish(sim)
+
+    def finish(self, sim):
+        """Close the recording, e.g. when the player quits in the middle of a run."""
+        self.replay.final_checksum = state_checksum(sim)
+        if self.path is not None:
+            self.replay.save(self.path)
+
+
+def run_replay(replay, verify=True):
+    """Play ``replay`` back headlessly and return the finished Simulation.
+
+    With ``verify`` every checksum is compared and the first difference
+    raises ReplayMismatch naming the tick.
+    """
+    sim = Simulation(replay.seed, config=replay.config)
+    moves = replay.moves
+    n_moves = len(moves)
+    next_move = 0
+    interval = replay.interval
+    checksums = replay.checksums
+    step = sim.step
+    move = sim.move
+    for tick in range(replay.ticks):
+        while next_move < n_moves and moves[next_move][0] == tick:
+            _, dx, dy = moves[next_move]
+            move(dx, dy)
+            next_move += 1
+        step()
+        if verify and sim.tick % interval == 0:
+            expected = checksums[sim.tick // interval - 1]
+            if state_checksum(sim) != expected:
+                raise ReplayMismatch(f"state differs from the recording at tick {sim.tick}")
+    # Moves after the last tick, e.g. an immediate-mode key press just before quitting
+    while next_move < n_moves:
+        _, dx, dy = moves[next_move]
+        move(dx, dy)
+        next_move += 1
+    if verify and state_checksum(sim) != replay.final_checksum:
+        raise ReplayMismatch(f"final state differs from the recording at tick {sim.tick}")
+    return sim
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python replay.py REPLAY_FILE [REPEAT]")
+    replay = Replay.load(sys.argv[1])
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    start = time.perf_counter()
+    for _ in range(repeat):
+        sim = run_replay(replay)
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{replay.ticks} ticks ({replay.ticks / FPS:.0f} s of play), {len(replay.moves)} moves: "
+          f"{sim.result()}")
+    print(f"replayed and verified in {elapsed * 1000:.2f} ms ({replay.ticks / elapsed:,.0f} ticks/s)")
@@ -0,0 +1,297 @@
+"""Streaming reader for run logs (data.csv and the CSVs of balance.py).
+
+A log is parsed in blocks of about ``BLOCK_BYTES`` with typed columns and
+every block is folded into a RunStats, the aggregates behind the
+data_visualize plots. The rows are dropped after that, so memory depends
+on how many distinct values the columns take, not on the length of the
+log. RunLog remembers how far it has read: calling ``update()`` again
+only parses the rows appended since (follow mode).
+
+The (moves, time) counts are exact until they hold ``MOVES_TIME_CELLS``
+pairs; past that they are merged into coarser cells, so no aggregate
+grows without bound.
+
+After reading a whole log, its RunStats are saved next to it in a summary
+sidecar (``<log>.summary.json``) together with the log's size and mtime.
+Opening the unchanged log again loads the sidecar instead of parsing.
+"""
+import io
+import json
+import os
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from telemetry import RUN_FIELDS
+
+BLOCK_BYTES = 8 << 20
+DTYPES = {
+    "game_result": "category",
+    "score": "int32",
+    "time": "int32",
+    "power-up_collected": "int16",
+    "total_move": "int32",
+}
+QUANTILES = (0.25, 0.5, 0.75)
+MOVES_TIME_CELLS = 1 << 16  # most (moves, time) pairs counted before they are coarsened
+SUMMARY_SUFFIX = ".summary.json"
+SUMMARY_VERSION = 2
+
+
+def counts(values):
+    """{value: occurrences} of a NumPy array, with Python ints as keys."""
+    return pd.Series(values).value_counts(sort=False).to_dict()
+
+
+def source_key(path):
+    """What identifies one version of a file: its size and modification time."""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def load_summary(path):
+    """The sidecar of ``path`` as a dict, or None if it is missing or out of date."""
+    try:
+        with open(path + SUMMARY_SUFFIX) as file:
+            summary = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if summary.get("version") != SUMMARY_VERSION or summary.get("source") != source_key(path):
+        return None
+    return summary
+
+
+def save_summary(path, stats, **extra):
+    """Write the sidecar of ``path``; ``extra`` is kept with the stats.
+
+    The sidecar is only a cache, so a read-only directory just means there
+    is none.
+    """
+    summary = dict(extra, version=SUMMARY_VERSION, source=source_key(path), stats=stats.to_json())
+    temporary = path + SUMMARY_SUFFIX + ".tmp"
+    try:
+        with open(temporary, "w") as file:
+            json.dump(summary, file)
+        os.replace(temporary, path + SUMMARY_SUFFIX)
+    except OSError:
+        pass
+
+
+def weighted_quantile(values, cumulative, q):
+    """Quantile ``q`` of sorted ``values`` with running run counts ``cumulative``.
+
+    Interpolates linearly between the two closest ranks, like pandas.
+    """
+    position = q * (cumulative[-1] - 1)
+    below = int(position)
+    low, high = np.searchsorted(cumulative, [below, below + 1], side="right")
+    high = min(high, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - below)
+
+
+class RunStats:
+    """Aggregates of a run log that can be added to one block of rows at a time.
+
+    Every aggregate counts runs per distinct value (or pair of values), so
+    the plots and the score statistics are exact and merging two logs is
+    adding the counters. Moves, time and power-ups are never negative.
+
+    The one exception is ``moves_time``, which could otherwise get an entry
+    for every run: once it holds more than ``MOVES_TIME_CELLS`` pairs, moves
+    and time are rounded down to multiples of ``moves_time_step``, which
+    doubles until it fits again. It then holds at most MOVES_TIME_CELLS
+    entries, each the corner of a step x step cell. Until then, which
+    covers every log of up to MOVES_TIME_CELLS runs, the step stays 1 and
+    the counts are exact.
+    """
+    def __init__(self):
+        self.rows = 0
+        self.results = Counter()  # game_result -> runs
+        self.scores = Counter()  # score -> runs
+        self.moves_time = Counter()  # (total_move, time) rounded down to the step -> runs
+        self.moves_time_step = 1
+        self.powerups = Counter()  # (game_result, power-ups collected) -> runs
+
+    @classmethod
+    def from_frame(cls, data):
+        stats = cls()
+        stats.add(data)
+        return stats
+
+    def to_json(self):
+        """The counters as JSON-compatible lists."""
+        return {
+            "rows": self.rows,
+            "results": list(self.results.items()),
+            "scores": list(self.scores.items()),
+            "moves_time": [[moves, time, runs] for (moves, time), runs in self.moves_time.items()],
+            "moves_time_step": self.moves_time_step,
+            "powerups": [[result, powerups, runs]
+                         for (result, powerups), runs in self.powerups.items()],
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        stats = cls()
+        stats.rows = data["rows"]
+        stats.results = Counter(dict(data["results"]))
+        stats.scores = Counter(dict(data["scores"]))
+        stats.moves_time = Counter({(moves, time): runs for moves, time, runs in data["moves_time"]})
+        stats.moves_time_step = data["moves_time_step"]
+        stats.powerups = Counter({(result, powerups): runs
+                                  for result, powerups, runs in data["powerups"]})
+        return stats
+
+    def add(self, data):
+        """Fold a DataFrame of runs (data.csv columns) into the aggregates."""
+        if data.empty:
+            return
+        result = data["game_result"].astype("category")
+        self.add_columns(result.cat.codes.to_numpy(), result.cat.categories,
+                         data["score"].to_numpy(), data["time"].to_numpy(),
+                         data["power-up_collected"].to_numpy(), data["total_move"].to_numpy())
+
+    def add_columns(self, codes, names, score, time, powerups, moves):
+        """Fold runs given as column arrays into the aggregates.
+
+        ``codes`` are indexes into ``names``, the game results; -1 is a run
+        without a result.
+        """
+        self.rows += len(codes)
+        # Pairs are counted as one int64 key each, much faster than a groupby
+        codes = codes.astype(np.int64)
+        for code, runs in counts(codes).items():
+            if code >= 0:
+                self.results[names[code]] += runs
+        self.scores.update(counts(score))
+        step = self.moves_time_step
+        pairs = moves.astype(np.int64) // step * step << 32 | time.astype(np.int64) // step * step
+        for key, runs in counts(pairs).items():
+            self.moves_time[key >> 32, key & 0xFFFFFFFF] += runs
+        while len(self.moves_time) > MOVES_TIME_CELLS:
+            self.coarsen_moves_time()
+        pairs = codes << 32 | powerups.astype(np.int64)
+        for key, runs in counts(pairs).items():
+            if key >= 0:
+                self.powerups[names[key >> 32], key & 0xFFFFFFFF] += runs
+
+    def coarsen_moves_time(self):
+        """Double ``moves_time_step`` and merge the pairs into the larger cells."""
+        step = self.moves_time_step = 2 * self.moves_time_step
+        merged = Counter()
+        for (moves, time), runs in self.moves_time.items():
+            merged[moves // step * step, time // step * step] += runs
+        self.moves_time = merged
+
+    def score_values(self):
+        """Distinct scores in ascending order and the number of runs with each."""
+        values = np.fromiter(self.scores.keys(), np.int64, len(self.scores))
+        counts = np.fromiter(self.scores.values(), np.int64, len(self.scores))
+        order = np.argsort(values)
+        return values[order], counts[order]
+
+    def describe(self):
+        """The score statistics of ``Series.describe()``, from the counts."""
+        values, counts = self.score_values()
+        if not len(values):
+            return pd.Series({"count": 0.0})
+        n = counts.sum()
+        mean = (values * counts).sum() / n
+        std = np.sqrt((counts * (values - mean) ** 2).sum() / (n - 1)) if n > 1 else np.nan
+        cumulative = np.cumsum(counts)
+        stats = {"count": float(n), "mean": mean, "std": std, "min": float(values[0])}
+        for q in QUANTILES:
+            stats[f"{q:.0%}"] = float(weighted_quantile(values, cumulative, q))
+        stats["max"] = float(values[-1])
+        return pd.Series(stats)
+
+    def score_histogram(self, bins=10):
+        """(counts, bin edges) as ``np.histogram`` of every score gives."""
+        values, counts = self.score_values()
+        return np.histogram(values, bins, weights=counts)
+
+
+class RunLog:
+    """A run log CSV read incrementally into ``stats``."""
+    def __init__(self, path, block_bytes=BLOCK_BYTES):
+        self.path = path
+        self.block_bytes = block_bytes
+        self.reset()
+
+    def reset(self):
+        self.stats = RunStats()
+        self.columns = None
+        self.offset = 0  # bytes parsed so far, always at the start of a line
+
+    def update(self, progress=None, cancel=None):
+        """Parse the complete rows added since the last call; returns how many.
+
+        The first call takes the rows from the sidecar if it is up to date.
+        A last line still being written is left for the next call. If the
+        file shrank it was replaced, and is read again from the start.
+        ``progress(offset, size)`` is called after every block, and the
+        threading.Event ``cancel`` stops the update between blocks; the
+        blocks parsed until then stay counted and a later call goes on
+        from there.
+        """
+        cached = 0
+        if self.columns is None:
+            summary = load_summary(self.path)
+            if summary is not None:
+                self.stats = RunStats.from_json(summary["stats"])
+                self.columns = summary["columns"]
+                self.offset = summary["offset"]
+                cached = self.stats.rows
+        whole = self.offset == 0
+        rows = 0
+        for data in self.frames(progress, cancel):
+            self.stats.add(data)
+            rows += len(data)
+        if whole and rows and not (cancel is not None and cancel.is_set()):
+            save_summary(self.path, self.stats, columns=self.columns, offset=self.offset)
+        return cached + rows
+
+    def frames(self, progress=None, cancel=None):
+        """The complete rows from ``offset`` on, as one typed DataFrame per block."""
+        with open(self.path, "rb") as file:
+            size = file.seek(0, os.SEEK_END)
+            if size < self.offset:
+                self.reset()
+            if self.columns is None and not self.read_header(file):
+                return
+            for block in self.blocks(file):
+                yield pd.read_csv(io.BytesIO(block), header=None, names=self.columns,
+                                  usecols=RUN_FIELDS, dtype=DTYPES)
+                if progress is not None:
+                    progress(self.offset, max(size, self.offset))
+                if cancel is not None and cancel.is_set():
+                    return
+
+    def read_header(self, file):
+        file.seek(0)
+        header = file.readline()
+        if not header.endswith(b"\n"):
+            return False
+        columns = header.decode().strip().split(",")
+        missing = [field for field in RUN_FIELDS if field not in columns]
+        if missing:
+            raise ValueError(f"{self.path} has no {', '.join(missing)} column")
+        self.columns = columns
+        self.offset = len(header)
+        return True
+
+    def blocks(self, file):
+        """Complete lines from ``offset`` on, about ``block_bytes`` at a time."""
+        file.seek(self.offset)
+        while True:
+            block = file.read(self.block_bytes)
+            if len(block) == self.block_bytes:
+                block += file.readline()  # finish the line cut by the block size
+            end = block.rfind(b"\n") + 1
+            if not end:
+                return
+            self.offset += end
+            yield block[:end]
+            if end < len(block):
+                return  # the rest is a line still being written
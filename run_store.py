@@ -0,0 +1,157 @@
+"""Binary columnar run store, opened with mmap instead of parsed.
+
+A ``.sdrc`` file holds the data.csv columns as fixed-width little-endian
+arrays, one after the other, each aligned to 8 bytes::
+
+    header      "<4sBQB": magic b"SDRC", version, rows, result names
+    names       per name: uint8 length, UTF-8 bytes
+    game_result uint8 index into the names
+    score       int32
+    time        int32
+    power-up_collected int16
+    total_move  int32
+
+RunStore maps the file and hands out the columns as NumPy views of the
+mapping, so opening costs the same for any number of rows and only the
+pages actually read are loaded. Its ``update`` has the RunLog interface
+and shares the summary sidecar, so data_visualize can open either.
+
+Convert a CSV (data.csv or a balance.py output) with::
+
+    python run_store.py data.csv runs.sdrc
+"""
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+
+import numpy as np
+
+from run_log import RunLog, RunStats, load_summary, save_summary
+from telemetry import RUN_FIELDS
+
+MAGIC = b"SDRC"
+VERSION = 1
+HEADER = struct.Struct("<4sBQB")
+ALIGN = 8
+SUFFIX = ".sdrc"
+CHUNK_ROWS = 1 << 20  # rows folded into the stats at a time
+COLUMNS = {
+    "game_result": np.dtype("u1"),
+    "score": np.dtype("<i4"),
+    "time": np.dtype("<i4"),
+    "power-up_collected": np.dtype("<i2"),
+    "total_move": np.dtype("<i4"),
+}
+
+
+def padding(size):
+    return -size % ALIGN
+
+
+def convert(csv_path, store_path, progress=None):
+    """Write the runs of a CSV run log to a new store; returns the number of rows.
+
+    The CSV is read block by block and every column is spooled to its own
+    temporary file, so memory does not grow with the log.
+    """
+    names = {}
+    rows = 0
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(store_path))) as spool:
+        files = {column: open(os.path.join(spool, str(i)), "wb") for i, column in enumerate(COLUMNS)}
+        try:
+            for data in RunLog(csv_path).frames(progress):
+                results = data["game_result"].astype("category")
+                for name in results.cat.categories:
+                    names.setdefault(name, len(names))
+                if len(names) > 255:
+                    raise ValueError(f"{csv_path} has more than 255 different game results")
+                codes = results.cat.codes.to_numpy()
+                if (codes < 0).any():
+                    raise ValueError(f"{csv_path} has runs without a game_result")
+                lookup = np.array([names[name] for name in results.cat.categories], np.uint8)
+                files["game_result"].write(lookup[codes].tobytes())
+                for column, dtype in COLUMNS.items():
+                    if column != "game_result":
+                        files[column].write(data[column].to_numpy(dtype).tobytes())
+                rows += len(data)
+        finally:
+            for file in files.values():
+                file.close()
+
+        encoded = [name.encode() for name in names]
+        header = HEADER.pack(MAGIC, VERSION, rows, len(encoded))
+        header += b"".join(struct.pack("<B", len(name)) + name for name in encoded)
+        temporary = store_path + ".tmp"
+        with open(temporary, "wb") as out:
+            out.write(header + bytes(padding(len(header))))
+            for i, (column, dtype) in enumerate(COLUMNS.items()):
+                with open(os.path.join(spool, str(i)), "rb") as file:
+                    shutil.copyfileobj(file, out)
+                out.write(bytes(padding(rows * dtype.itemsize)))
+        os.replace(temporary, store_path)
+    return rows
+
+
+class RunStore:
+    """A ``.sdrc`` file mapped read-only; ``columns`` are zero-copy views."""
+    def __init__(self, path):
+        self.path = path
+        self.stats = None
+        with open(path, "rb") as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.rows, count = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} run store")
+        offset = HEADER.size
+        self.names = []
+        for _ in range(count):
+            length = self.buffer[offset]
+            self.names.append(self.buffer[offset + 1:offset + 1 + length].decode())
+            offset += 1 + length
+        offset += padding(offset)
+        self.columns = {}
+        for column, dtype in COLUMNS.items():
+            self.columns[column] = np.frombuffer(self.buffer, dtype, self.rows, offset)
+            offset += self.rows * dtype.itemsize
+            offset += padding(offset)
+
+    def update(self, progress=None, cancel=None):
+        """Fill ``stats`` (from the sidecar when it is up to date); returns the rows added.
+
+        A store is written once, so later calls add nothing.
+        """
+        if self.stats is not None:
+            return 0
+        summary = load_summary(self.path)
+        if summary is not None:
+            self.stats = RunStats.from_json(summary["stats"])
+            return self.stats.rows
+        stats = RunStats()
+        columns = self.columns
+        names = np.array(self.names, dtype=object)
+        row_bytes = sum(dtype.itemsize for dtype in COLUMNS.values())
+        for start in range(0, self.rows, CHUNK_ROWS):
+            end = min(start + CHUNK_ROWS, self.rows)
+            stats.add_columns(columns["game_result"][start:end], names,
+                              *(columns[column][start:end] for column in RUN_FIELDS[1:]))
+            if progress is not None:
+                progress(end * row_bytes, self.rows * row_bytes)
+            if cancel is not None and cancel.is_set():
+                return 0  # the stats of part of the store are no use to anyone
+        self.stats = stats
+        save_summary(self.path, stats)
+        return stats.rows
+
+
+def open_runs(path):
+    """A RunStore for ``.sdrc`` files, a RunLog for anything else."""
+    return RunStore(path) if path.endswith(SUFFIX) else RunLog(path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python run_store.py RUNS.csv RUNS.sdrc")
+    print(f"{convert(sys.argv[1], sys.argv[2]):,} runs written to {sys.argv[2]}")
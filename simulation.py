@@ -0,0 +1,297 @@
+import random
+from dataclasses import dataclass
+
+from danger_grid import DangerGrid
+from projectiles import ProjectileStore
+from trajectory import StraightFireballs
+
+# Constants for board size and game speed
+BOARD_SIZE = 25
+FPS = 10  # simulation ticks per second of game time
+
+DIRECTIONS = {
+    "up": (0, -1),
+    "down": (0, 1),
+    "left": (-1, 0),
+    "right": (1, 0),
+}
+SHOT_DIRECTIONS = [DIRECTIONS[name] for name in ("up", "down", "left", "right")]
+
+
+@dataclass
+class SimConfig:
+    """Tunable rules of the game. Defaults match the original game."""
+    board_size: int = BOARD_SIZE
+    dragon_hp: int = 10
+    fireball_cooldown: int = 5
+    random_fireball_base: int = 6  # dragon spawns (base - hp) random fireballs
+    powerup_chance: int = 300  # 1 in N chance per tick
+    powerup_interval: int = 20 * FPS  # forced power-up spawn, in ticks
+    invincible_ticks: int = 5 * FPS
+    start_score: int = 5000
+    powerup_cost: int = 500
+    win_bonus: int = 3000
+
+
+class Player:
+    def __init__(self, position=(0, 0), board_size=BOARD_SIZE):
+        self.position = position
+        self.board_size = board_size
+
+    def move(self, dx, dy):
+        x, y = self.position
+        new_x = x + dx
+        new_y = y + dy
+        if 0 <= new_x < self.board_size and 0 <= new_y < self.board_size:
+            self.position = (new_x, new_y)
+            return True
+        return False
+
+
+class Dragon:
+    def __init__(self, position=(BOARD_SIZE-1, BOARD_SIZE-1), hp=10,
+                 board_size=BOARD_SIZE, fireball_cooldown=5, random_fireball_base=6):
+        self.position = position
+        self.hp = hp
+        self.board_size = board_size
+        self.fireball_cooldown = 0  # Delay timer for shooting
+        self.cooldown_ticks = fireball_cooldown
+        self.random_fireball_base = random_fireball_base
+
+    def take_damage(self):
+        self.hp -= 1
+
+    def randomize_position(self, rng=random):
+        self.position = (rng.randint(0, self.board_size - 1),
+                         rng.randint(0, self.board_size - 1))
+
+    def shoot_fireballs(self, fireballs, tick):
+        """Shoots straight-line fireballs but has a cooldown. Returns how many were shot."""
+        if 5 <= self.hp < 8:
+            if self.fireball_cooldown == 0:
+                self.fireball_cooldown = self.cooldown_ticks  # Set delay before next shot
+                for direction in SHOT_DIRECTIONS:
+                    fireballs.shoot(self.position, direction, tick)
+                return len(SHOT_DIRECTIONS)
+        return 0
+
+    def spawn_fireballs(self, store, rng=random):
+        """Spawns random fireballs lasting 10-30 ticks when HP < 5. Returns how many were added."""
+        if self.hp < 5:
+            count = self.random_fireball_base - self.hp
+            store.reserve(store.count + count)
+            # randrange(n) draws the same numbers as randint(0, n - 1), minus two calls
+            draw = rng.randrange
+            size = self.board_size
+            for _ in range(count):
+                store.add(draw(size), draw(size), draw(10, 31))
+            return count
+        return 0
+
+    def update_cooldown(self):
+        if self.fireball_cooldown > 0:
+            self.fireball_cooldown -= 1
+
+
+class PowerUp:
+    def __init__(self, rng=random, board_size=BOARD_SIZE):
+        self.position = (rng.randint(0, board_size - 1), rng.randint(0, board_size - 1))
+
+
+class Simulation:
+    """Game rules stepped on a tick counter, with no display, mixer or wall clock.
+
+    Every source of randomness goes through ``self.rng`` so a run is fully
+    determined by its seed and the moves fed to ``step``. Without a seed (or
+    rng) one is drawn, so every game can still be recorded and replayed.
+    """
+    def __init__(self, seed=None, rng=None, config=None):
+        self.config = config or SimConfig()
+        if rng is None:
+            if seed is None:
+                seed = random.getrandbits(64)
+            rng = random.Random(seed)
+        self.seed = seed  # None when an rng was passed in
+        self.rng = rng
+        self.profiler = None  # optional profiler.FrameProfiler timing update_fireballs
+        self.telemetry = None  # optional telemetry.TelemetryWriter, gets each finished run
+        self.recorder = None  # optional replay.ReplayRecorder, gets the moves of each run
+        self.reset()
+
+    def reset(self, seed=None):
+        """Start a new run, reseeding first if ``seed`` is given."""
+        if seed is not None:
+            self.seed = seed
+            self.rng.seed(seed)
+        cfg = self.config
+        size = cfg.board_size
+        self.tick = 0
+        self.player = Player(position=(0, 0), board_size=size)
+        self.dragon = Dragon(position=(self.rng.randint(0, size - 1),
+                                       self.rng.randint(0, size - 1)),
+                             hp=cfg.dragon_hp, board_size=size,
+                             fireball_cooldown=cfg.fireball_cooldown,
+                             random_fireball_base=cfg.random_fireball_base)
+        self.fireballs = StraightFireballs(size)  # straight-line fireballs
+        self.fireball_randoms = ProjectileStore()  # random fireballs with a lifetime
+        self.danger = DangerGrid(size)  # random fireball count per cell
+        self.random_spawned = 0  # random fireballs spawned so far, for planner.DangerMap
+        self.powerup = None
+        self.powerup_spawn_tick = 0  # track last forced spawn
+        self.invincible = False
+        self.invincible_tick = 0
+        self.game_over = False
+        self.win = False
+        self.score = cfg.start_score
+        self.move_count = 0
+        self.powerups_collected = 0
+        if self.recorder is not None:
+            self.recorder.begin(self)
+
+    def step(self, dx=0, dy=0):
+        """Advance the game by one tick and return the list of events that happened."""
+        events = []
+        if self.game_over:
+            return events
+        if dx or dy:
+            self.move(dx, dy)
+        self.update_game(events)
+        telemetry = self.telemetry
+        if telemetry is not None:
+            if events and telemetry.events_enabled:
+                telemetry.record_events(self.tick, events)
+            if self.game_over:
+                telemetry.record_run(self.result())
+        self.tick += 1
+        if self.recorder is not None:
+            self.recorder.tick_done(self)
+        return events
+
+    def move(self, dx, dy):
+        """Move the player now; ``move_count`` only counts moves that happened."""
+        if self.recorder is not None:
+            self.recorder.move(self.tick, dx, dy)
+        if self.player.move(dx, dy):
+            self.move_count += 1
+            return True
+        return False
+
+    def update_game(self, events):
+        cfg = self.config
+        if self.player.position == self.dragon.position:
+            self.dragon.take_damage()
+            events.append("dragon_hit")
+            self.dragon.randomize_position(self.rng)
+            events.append("dragon_teleport")
+            if self.dragon.hp <= 0:
+                self.game_over = True
+                self.win = True
+                events.append("win")
+
+        self.dragon.update_cooldown()
+        self.dragon.shoot_fireballs(self.fireballs, self.tick)
+        first = self.fireball_randoms.count
+        spawned = self.dragon.spawn_fireballs(self.fireball_randoms, self.rng)
+        if spawned:
+            self.mark_spawned(self.fireball_randoms, first)
+            self.random_spawned += spawned
+
+        if self.profiler is None:
+            self.update_fireballs(events)
+        else:
+            start = self.profiler.clock()
+            self.update_fireballs(events)
+            self.profiler.record("update_fireballs", start)
+
+        # Check power-up pickup
+        if self.powerup and self.player.position == self.powerup.position:
+            self.invincible = True
+            self.invincible_tick = self.tick
+            self.score = max(0, self.score - cfg.powerup_cost)
+            self.powerup = None
+            self.powerups_collected += 1
+            events.append("powerup_collected")
+
+        # Handle invincibility duration
+        if self.invincible and self.tick - self.invincible_tick >= cfg.invincible_ticks:
+            self.invincible = False
+            events.append("invincibility_ended")
+
+        # Randomly spawn a powerup (1 in powerup_chance per tick)
+        if not self.powerup and self.rng.randint(1, cfg.powerup_chance) == 1:
+            self.powerup = PowerUp(self.rng, cfg.board_size)
+
+        self.score -= 1  # Decrease score per tick
+
+        # Spawn a power-up every powerup_interval ticks
+        if not self.powerup and self.tick - self.powerup_spawn_tick >= cfg.powerup_interval:
+            self.powerup = PowerUp(self.rng, cfg.board_size)
+            self.powerup_spawn_tick = self.tick
+            events.append("powerup_spawned")
+
+    def mark_spawned(self, store, first):
+        for i in range(first, store.count):
+            self.danger.add((store.x[i], store.y[i]))
+
+    def update_fireballs(self, events):
+        danger = self.danger
+        player = self.player.position
+        # Straight fireballs are checked in closed form, then the ones that
+        # left the board on this tick are retired
+        hit = self.fireballs.is_lethal(player, self.tick)
+        self.fireballs.update(self.tick)
+
+        if not self.invincible:
+            if hit:
+                self.player_hit(events, "player_hit")
+            if danger.is_lethal(player):
+                self.player_hit(events, "player_hit_random")
+
+        # Age random fireballs
+        store = self.fireball_randoms
+        xs, ys, lives = store.x, store.y, store.life
+        keep = 0
+        for i in range(store.count):
+            life = lives[i] - 1
+            if life > 0:
+                if keep != i:
+                    xs[keep], ys[keep] = xs[i], ys[i]
+                lives[keep] = life
+                keep += 1
+            else:
+                danger.remove((xs[i], ys[i]))
+        store.count = keep
+
+    def is_safe(self, position, ahead=1):
+        """Look-ahead for bots: True if no known fireball is on the cell during
+        the ``ahead``-th tick from now.
+
+        Straight fireballs are exact. Random fireballs are assumed to still be
+        burning, and fireballs the dragon has not spawned yet are unknown.
+        """
+        return (not self.danger.is_lethal(position)
+                and not self.fireballs.is_lethal(position, self.tick + ahead - 1))
+
+    def player_hit(self, events, event):
+        self.game_over = True
+        self.win = False
+        events.append(event)
+
+    def elapsed_seconds(self):
+        return self.tick // FPS
+
+    def final_score(self):
+        """Score as shown on the game over screen (and stored in data.csv)."""
+        if self.win:
+            return self.score + self.config.win_bonus
+        return self.score
+
+    def result(self):
+        """One finished run in the data.csv column layout."""
+        return {
+            "game_result": "Win" if self.win else "Lose",
+            "score": self.final_score(),
+            "time": self.elapsed_seconds(),
+            "power-up_collected": self.powerups_collected,
+            "total_move": self.move_count,
+        }
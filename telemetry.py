@@ -0,0 +1,98 @@
+import csv
+import os
+import queue
+import threading
+import time
+
+RUN_FIELDS = ["game_result", "score", "time", "power-up_collected", "total_move"]
+EVENT_FIELDS = ["run", "tick", "event"]
+
+_STOP = object()
+
+
+class TelemetryWriter:
+    """Appends finished runs to data.csv from a background thread.
+
+    ``record_run`` and ``record_events`` only put a row on a bounded queue,
+    so the game loop never waits for the disk. The writer thread collects
+    up to ``batch_size`` rows (or whatever arrived within ``flush_interval``
+    seconds) and appends them with one write per file. If the queue is full
+    the row is dropped and counted in ``dropped`` instead of blocking.
+
+    Run records use the data.csv columns read by data_visualize.py. Per-tick
+    event records ("run,tick,event") are only written when ``events_path``
+    is given; ``run`` numbers the runs seen by this writer.
+    """
+    def __init__(self, path="data.csv", events_path=None, maxsize=4096,
+                 batch_size=256, flush_interval=0.5):
+        self.path = path
+        self.events_path = events_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize)
+        self.run_index = 0
+        self.dropped = 0
+        self.written = 0
+        self.thread = threading.Thread(target=self._work, name="telemetry", daemon=True)
+        self.thread.start()
+
+    @property
+    def events_enabled(self):
+        return self.events_path is not None
+
+    def record_run(self, result):
+        """Queue one finished run (a Simulation.result() dict)."""
+        self._put((self.path, [result[field] for field in RUN_FIELDS]))
+        self.run_index += 1
+
+    def record_events(self, tick, events):
+        if self.events_path is None:
+            return
+        for event in events:
+            self._put((self.events_path, [self.run_index, tick, event]))
+
+    def _put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=5.0):
+        """Write everything still queued and stop the thread."""
+        if self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join(timeout)
+
+    def _work(self):
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                running = False
+            self._write(batch)
+
+    def _write(self, batch):
+        rows = {}
+        for item in batch:
+            if item is _STOP:
+                continue
+            path, row = item
+            rows.setdefault(path, []).append(row)
+        for path, path_rows in rows.items():
+            header = RUN_FIELDS if path == self.path else EVENT_FIELDS
+            new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+            with open(path, "a", newline="") as file:
+                writer = csv.writer(file)
+                if new_file:
+                    writer.writerow(header)
+                writer.writerows(path_rows)
+            self.written += len(path_rows)
@@ -0,0 +1,21 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from env import VectorEnv  # noqa: E402
+
+
+def test_reset_starts_new_runs():
+    env = VectorEnv(4, n_workers=2, seed=3)
+    try:
+        first = env.reset()["scalars"].copy()
+        assert (first[:, 2] == 0).all()
+        for _ in range(30):
+            env.step(np.zeros(4, np.int8))
+        assert (env.scalars[:, 2] > 0).all()
+        observations = env.reset()
+        assert (observations["scalars"][:, 2] == 0).all()
+        assert (observations["scalars"][:, 0] == 1).all()
+        assert (observations["board"][:, 2:4] == 0).all()  # no fireballs in flight yet
+    finally:
+        env.close()
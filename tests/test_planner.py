@@ -0,0 +1,21 @@
+import random
+
+from planner import HORIZON, DangerMap, Planner
+from simulation import Simulation, SimConfig
+
+
+def test_incremental_map_matches_rebuild_on_board_wider_than_horizon():
+    size = 150
+    assert size > HORIZON
+    sim = Simulation(0, config=SimConfig(board_size=size))
+    sim.dragon.hp = 7  # straight fireball phase
+    planner = Planner()
+    rng = random.Random(0)
+    for _ in range(400):
+        move = planner(sim, rng)
+        fresh = DangerMap()
+        fresh.rebuild(sim)
+        assert [planner.danger.layer(k) for k in range(HORIZON)] == \
+            [fresh.layer(k) for k in range(HORIZON)], f"tick {sim.tick}"
+        sim.step(*move)
+        sim.game_over = False
@@ -0,0 +1,14 @@
+from replay import Replay, ReplayRecorder, run_replay
+from simulation import Simulation
+
+
+def test_move_after_last_tick_is_replayed():
+    sim = Simulation(7)
+    recorder = ReplayRecorder().attach(sim)
+    for _ in range(30):
+        sim.step(1, 0)
+    assert sim.move(0, 1)  # immediate-mode key press on tick 30, then quit
+    recorder.finish(sim)
+    replay = Replay.from_bytes(recorder.replay.to_bytes())
+    assert replay.ticks == 30 and replay.moves[-1][0] == 30
+    assert run_replay(replay).player.position == sim.player.position
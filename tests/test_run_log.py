@@ -0,0 +1,37 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+import run_log  # noqa: E402
+from run_log import RunStats  # noqa: E402
+
+
+def add_runs(stats, moves, time):
+    n = len(moves)
+    stats.add_columns(np.zeros(n, np.int8), ["Win"], np.zeros(n, np.int32), time,
+                      np.zeros(n, np.int16), moves)
+
+
+def test_moves_time_stays_bounded(monkeypatch):
+    monkeypatch.setattr(run_log, "MOVES_TIME_CELLS", 100)
+    rng = np.random.default_rng(0)
+    stats = RunStats()
+    for _ in range(20):
+        add_runs(stats, rng.integers(0, 5000, 1000, np.int32), rng.integers(0, 600, 1000, np.int32))
+        assert len(stats.moves_time) <= 100
+    step = stats.moves_time_step
+    assert step > 1
+    assert sum(stats.moves_time.values()) == stats.rows == 20000
+    assert all(moves % step == 0 and time % step == 0 for moves, time in stats.moves_time)
+    loaded = RunStats.from_json(stats.to_json())
+    assert loaded.moves_time == stats.moves_time and loaded.moves_time_step == step
+
+
+def test_moves_time_is_exact_below_the_cap():
+    stats = RunStats()
+    moves = np.array([3, 3, 7], np.int32)
+    time = np.array([1, 1, 2], np.int32)
+    add_runs(stats, moves, time)
+    assert stats.moves_time_step == 1
+    assert stats.moves_time == {(3, 1): 2, (7, 2): 1}
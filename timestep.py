@@ -0,0 +1,78 @@
+import time
+from collections import deque
+
+
+def percentile(values, q):
+    """q-th percentile (0-100) of ``values`` by nearest rank, 0.0 when empty."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class FixedTimestep:
+    """Runs simulation ticks at a fixed rate, independent of the render rate.
+
+    Call ``advance`` once per rendered frame; it returns how many ticks are
+    due. A slow frame never asks for more than
+    ``max_ticks_per_frame`` ticks (the rest are dropped and counted), so one
+    stall cannot snowball into a spiral of ever longer catch-up frames.
+    """
+    def __init__(self, tick_rate, max_ticks_per_frame=5, max_frame_time=0.25,
+                 clock=time.perf_counter, history=600):
+        self.tick_rate = tick_rate
+        self.dt = 1.0 / tick_rate
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.max_frame_time = max_frame_time
+        self.clock = clock
+        self.tick_intervals = deque(maxlen=history)
+        self.frame_intervals = deque(maxlen=history)
+        self.reset()
+
+    def reset(self):
+        """Start over, e.g. when play begins after a menu."""
+        self.accumulator = 0.0
+        self.last_frame = None
+        self.last_tick = None
+        self.dropped_ticks = 0
+
+    def advance(self):
+        now = self.clock()
+        if self.last_frame is None:
+            self.last_frame = now
+            return 0
+        elapsed = now - self.last_frame
+        self.last_frame = now
+        self.frame_intervals.append(elapsed)
+
+        self.accumulator += min(elapsed, self.max_frame_time)
+        ticks = int(self.accumulator / self.dt)
+        self.accumulator -= ticks * self.dt
+        if ticks > self.max_ticks_per_frame:
+            self.dropped_ticks += ticks - self.max_ticks_per_frame
+            ticks = self.max_ticks_per_frame
+        return ticks
+
+    def tick_done(self):
+        """Record when a tick actually ran, for the jitter numbers."""
+        now = self.clock()
+        if self.last_tick is not None:
+            self.tick_intervals.append(now - self.last_tick)
+        self.last_tick = now
+
+    def jitter(self):
+        """Measured tick and frame pacing in milliseconds.
+
+        ``*_jitter_ms`` is the mean absolute deviation of the interval from
+        its mean, ``*_p99_ms`` the 99th percentile interval.
+        """
+        stats = {"dropped_ticks": self.dropped_ticks}
+        for name, intervals in (("tick", self.tick_intervals), ("frame", self.frame_intervals)):
+            values = [interval * 1000 for interval in intervals]
+            mean = sum(values) / len(values) if values else 0.0
+            stats[f"{name}_interval_ms"] = mean
+            stats[f"{name}_jitter_ms"] = (sum(abs(v - mean) for v in values) / len(values)
+                                          if values else 0.0)
+            stats[f"{name}_p99_ms"] = percentile(values, 99)
+        return stats
@@ -0,0 +1,159 @@
+import heapq
+from itertools import count
+
+
+def edge_steps(size, x, y, dx, dy):
+    """Number of moves from (x, y) in direction (dx, dy) before the edge of the board."""
+    if dx > 0:
+        return size - 1 - x
+    if dx < 0:
+        return x
+    if dy > 0:
+        return size - 1 - y
+    return y
+
+
+class StraightFireballs:
+    """Straight-line fireballs stored as (origin, direction, spawn tick).
+
+    A fireball shot on tick ``s`` moves one cell on every tick starting with
+    ``s`` itself, so on tick ``t`` it is at ``origin + direction * (t - s + 1)``.
+    When the next cell would be off the board it stays on its edge cell for
+    one more (still lethal) tick and is then gone. Positions are therefore
+    computed on demand instead of being updated every tick:
+
+    * fireballs with the same origin and direction form a lane, which only
+      keeps their spawn ticks. The fireball of a lane that is ``d`` cells
+      from the origin on tick ``t`` was shot on ``t + 1 - d``, so testing a
+      cell is one set lookup per lane, however many fireballs are in it,
+    * lanes are indexed by the row (moving left/right) or column (moving
+      up/down) they run along, so a collision test only looks at the lanes
+      crossing that cell and drawing a viewport only at the lanes crossing it,
+    * a heap ordered by last lethal tick retires fireballs without scanning
+      the others.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.tick = 0  # tick of the last update, positions() are for this tick
+        self.fireballs = {}  # id -> (x, y, dx, dy, spawn tick, steps to the edge)
+        self.lanes = {}  # (x, y, dx, dy) -> [steps to the edge, set of spawn ticks]
+        self.rows = {}  # y -> lanes moving horizontally along that row
+        self.columns = {}  # x -> lanes moving vertically along that column
+        self.expiry = []  # heap of (last lethal tick, id)
+        self.ids = count()
+
+    def shoot(self, position, direction, tick):
+        x, y = position
+        dx, dy = direction
+        steps = edge_steps(self.size, x, y, dx, dy)
+        fireball_id = next(self.ids)
+        self.fireballs[fireball_id] = (x, y, dx, dy, tick, steps)
+        key = (x, y, dx, dy)
+        lane = self.lanes.get(key)
+        if lane is None:
+            lane = self.lanes[key] = [steps, set()]
+            if dy == 0:
+                self.rows.setdefault(y, set()).add(key)
+            else:
+                self.columns.setdefault(x, set()).add(key)
+        lane[1].add(tick)
+        heapq.heappush(self.expiry, (tick + steps, fireball_id))
+
+    def position(self, fireball_id, tick):
+        """Cell of a fireball on ``tick``, or None if it is not on the board then."""
+        x, y, dx, dy, spawn, steps = self.fireballs[fireball_id]
+        if tick < spawn or tick > spawn + steps:
+            return None
+        moved = min(tick - spawn + 1, steps)
+        return x + dx * moved, y + dy * moved
+
+    @staticmethod
+    def lane_spawns(steps, d, tick):
+        """Spawn ticks that put a fireball ``d`` cells down its lane on ``tick``."""
+        if d < 0 or d > steps:
+            return ()
+        if d < steps:
+            return (tick + 1 - d,) if d else ()
+        if steps == 0:
+            return (tick,)  # shot from the edge outwards: burns on the origin for one tick
+        return tick + 1 - steps, tick - steps  # on the edge cell for two ticks
+
+    def is_lethal(self, position, tick):
+        """True if a known fireball is on ``position`` during ``tick``.
+
+        Fireballs the dragon has not shot yet are of course not included.
+        """
+        x, y = position
+        lanes, lane_spawns = self.lanes, self.lane_spawns
+        for key in self.rows.get(y, ()):
+            steps, spawns = lanes[key]
+            for spawn in lane_spawns(steps, (x - key[0]) * key[2], tick):
+                if spawn in spawns:
+                    return True
+        for key in self.columns.get(x, ()):
+            steps, spawns = lanes[key]
+            for spawn in lane_spawns(steps, (y - key[1]) * key[3], tick):
+                if spawn in spawns:
+                    return True
+        return False
+
+    def update(self, tick):
+        """Finish ``tick``: drop the fireballs that left the board on it."""
+        self.tick = tick
+        expiry = self.expiry
+        while expiry and expiry[0][0] <= tick:
+            _, fireball_id = heapq.heappop(expiry)
+            x, y, dx, dy, spawn, _ = self.fireballs.pop(fireball_id)
+            key = (x, y, dx, dy)
+            spawns = self.lanes[key][1]
+            spawns.discard(spawn)
+            if not spawns:
+                del self.lanes[key]
+                if dy == 0:
+                    self.rows[y].discard(key)
+                else:
+                    self.columns[x].discard(key)
+
+    def positions(self):
+        """Cells of the fireballs still on the board after the last update."""
+        tick = self.tick
+        return [(x + dx * (tick - spawn + 1), y + dy * (tick - spawn + 1))
+                for x, y, dx, dy, spawn, _ in self.fireballs.values()]
+
+    def positions_in(self, left, top, right, bottom):
+        """positions() of the fireballs inside columns left..right-1 and rows top..bottom-1.
+
+        Only the lanes crossing the rectangle are looked at, so the cost
+        depends on the size of the view, not of the board.
+        """
+        found = []
+        rect = (left, top, right, bottom)
+        for y in range(top, bottom):
+            for key in self.rows.get(y, ()):
+                self.lane_positions(key, key[0], key[2], left, right, rect, found)
+        for x in range(left, right):
+            for key in self.columns.get(x, ()):
+                self.lane_positions(key, key[1], key[3], top, bottom, rect, found)
+        return found
+
+    def lane_positions(self, key, origin, step, start, end, rect, found):
+        """Add the fireballs of one lane that are inside ``rect`` to ``found``."""
+        tick = self.tick
+        x, y, dx, dy = key
+        steps, spawns = self.lanes[key]
+        if len(spawns) <= end - start:
+            candidates = spawns
+        else:
+            # Long lane: only try the spawn ticks that would put a fireball in view
+            candidates = [spawn for along in range(start, end)
+                          for spawn in self.lane_spawns(steps, (along - origin) * step, tick)
+                          if spawn in spawns]
+        left, top, right, bottom = rect
+        for spawn in candidates:
+            moved = min(tick - spawn + 1, steps)
+            cx, cy = x + dx * moved, y + dy * moved
+            if left <= cx < right and top <= cy < bottom:
+                found.append((cx, cy))
+
+    def __len__(self):
+        return len(self.fireballs)